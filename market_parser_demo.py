@@ -8,12 +8,21 @@ import os
 import sys
 import asyncio
 import math
-from datetime import datetime, timedelta
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from scipy.stats import norm
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional - fall back to the plain Python kernel
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 import httpx
+import orjson
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
@@ -27,6 +36,17 @@ load_dotenv()
 
 console = Console()
 
+# Quotes are reused for back-to-back Greeks requests on the same symbol
+PRICE_CACHE_TTL = 5.0  # seconds
+PRICE_CACHE_SIZE = 256
+
+# Covered calls are suggested at the richest strike whose delta stays under this cap
+COVERED_CALL_MAX_DELTA = 0.30
+
+# get_today_date may be called several times per query; refresh at most once a minute
+TODAY_CACHE_TTL = 60.0  # seconds
+_today_cache = (float("-inf"), "")  # (computed_at, "YYYY-MM-DD")
+
 class MarketQuery(BaseModel):
     """Model for market query responses"""
     symbol: Optional[str] = None
@@ -43,6 +63,82 @@ class OptionsGreeks(BaseModel):
     rho: float
     implied_volatility: float
 
+@njit(cache=True, fastmath=True)
+def _norm_cdf(x):
+    """Standard normal CDF via erf (avoids importing scipy.stats)"""
+    return 0.5 * (1.0 + math.erf(x * 0.7071067811865476))
+
+@njit(cache=True, fastmath=True)
+def _norm_pdf(x):
+    """Standard normal PDF: 1/sqrt(2*pi) * e^(-x^2/2)"""
+    return 0.3989422804014327 * math.exp(-0.5 * x * x)
+
+@njit(cache=True, fastmath=True)
+def _bs_greeks_scalar(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes Greeks kernel returning (delta, gamma, theta, vega, rho)"""
+    
+    # Shared subexpressions
+    sqrt_T = math.sqrt(time_to_expiry)
+    sigma_sqrt_T = volatility * sqrt_T
+    discount = math.exp(-risk_free_rate * time_to_expiry)
+    
+    # Calculate d1 and d2
+    d1 = (math.log(spot_price / strike_price) + 
+          (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    
+    # Standard normal CDF and PDF
+    N_d1 = _norm_cdf(d1)
+    N_d2 = _norm_cdf(d2)
+    n_d1 = _norm_pdf(d1)
+    
+    # phi is +1 for calls and -1 for puts; puts use N(x) - 1 = -N(-x), so a
+    # single shift replaces the call/put branches
+    phi = 2.0 * is_call - 1.0
+    put_shift = 0.5 * (1.0 - phi)
+    signed_N_d2 = N_d2 - put_shift
+    
+    delta = N_d1 - put_shift
+    theta = (-(spot_price * n_d1 * volatility) / (2 * sqrt_T) -
+            risk_free_rate * strike_price * discount * signed_N_d2) / 365
+    rho = strike_price * time_to_expiry * discount * signed_N_d2 / 100
+    
+    # Gamma and Vega are the same for calls and puts
+    gamma = n_d1 / (spot_price * sigma_sqrt_T)
+    vega = spot_price * n_d1 * sqrt_T / 100
+    
+    return delta, gamma, theta, vega, rho
+
+# Lookup table for fast_ndtr: N(x) sampled on [-NDTR_TABLE_RANGE, NDTR_TABLE_RANGE]
+NDTR_TABLE_SIZE = 4096
+NDTR_TABLE_RANGE = 8.0
+
+@lru_cache(maxsize=1)
+def _ndtr_table() -> np.ndarray:
+    """Build the fast_ndtr table on first use (keeps scipy out of startup)"""
+    from scipy.special import ndtr
+    return ndtr(np.linspace(-NDTR_TABLE_RANGE, NDTR_TABLE_RANGE, NDTR_TABLE_SIZE + 1))
+
+def fast_ndtr(x) -> np.ndarray:
+    """Standard normal CDF by linear interpolation in a precomputed table
+
+    Accurate to about 1e-6 and considerably cheaper than an erf evaluation
+    per element, for whole-chain scans where that tolerance is acceptable.
+    """
+    table = _ndtr_table()
+    position = np.clip(
+        (np.asarray(x, dtype=np.float64) + NDTR_TABLE_RANGE) * (NDTR_TABLE_SIZE / (2 * NDTR_TABLE_RANGE)),
+        0.0, NDTR_TABLE_SIZE
+    )
+    index = np.minimum(position.astype(np.int32), NDTR_TABLE_SIZE - 1)
+    weight = position - index
+    return table[index] * (1.0 - weight) + table[index + 1] * weight
+
+@lru_cache(maxsize=4096)
+def _cached_greeks(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Memoized Greeks kernel - callers pass inputs rounded to a stable key"""
+    return _bs_greeks_scalar(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call)
+
 class BlackScholesCalculator:
     """Black-Scholes options pricing and Greeks calculator"""
     
@@ -53,62 +149,140 @@ class BlackScholesCalculator:
         time_to_expiry: float,  # in years
         risk_free_rate: float = 0.05,  # 5% default
         volatility: float = 0.25,  # 25% default if not provided
-        option_type: str = "call"
+        option_type: str = "call",
+        is_call: Optional[int] = None  # pre-normalized 1/0 flag, overrides option_type
     ) -> OptionsGreeks:
         """Calculate Black-Scholes Greeks"""
+        if is_call is None:
+            is_call = 1 if option_type[:1] in ("c", "C") else 0
         
-        # Calculate d1 and d2
-        d1 = (math.log(spot_price / strike_price) + 
-              (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / (volatility * math.sqrt(time_to_expiry))
-        d2 = d1 - volatility * math.sqrt(time_to_expiry)
-        
-        # Standard normal CDF and PDF
-        N_d1 = norm.cdf(d1)
-        N_d2 = norm.cdf(d2)
-        n_d1 = norm.pdf(d1)
-        
-        if option_type.lower() == "call":
-            # Call option Greeks
-            delta = N_d1
-            theta = (-(spot_price * n_d1 * volatility) / (2 * math.sqrt(time_to_expiry)) -
-                    risk_free_rate * strike_price * math.exp(-risk_free_rate * time_to_expiry) * N_d2) / 365
-            rho = strike_price * time_to_expiry * math.exp(-risk_free_rate * time_to_expiry) * N_d2 / 100
-        else:  # put option
-            delta = N_d1 - 1
-            theta = (-(spot_price * n_d1 * volatility) / (2 * math.sqrt(time_to_expiry)) +
-                    risk_free_rate * strike_price * math.exp(-risk_free_rate * time_to_expiry) * (1 - N_d2)) / 365
-            rho = -strike_price * time_to_expiry * math.exp(-risk_free_rate * time_to_expiry) * (1 - N_d2) / 100
-        
-        # Gamma and Vega are the same for calls and puts
-        gamma = n_d1 / (spot_price * volatility * math.sqrt(time_to_expiry))
-        vega = spot_price * n_d1 * math.sqrt(time_to_expiry) / 100
+        delta, gamma, theta, vega, rho = _cached_greeks(
+            round(spot_price, 4), round(strike_price, 4), round(time_to_expiry, 6),
+            round(risk_free_rate, 6), round(volatility, 6), is_call
+        )
         
-        return OptionsGreeks(
-            delta=round(delta, 4),
-            gamma=round(gamma, 4),
-            theta=round(theta, 4),
-            vega=round(vega, 4),
-            rho=round(rho, 4),
+        # Values are computed locally, so skip pydantic validation
+        return OptionsGreeks.model_construct(
+            delta=delta,
+            gamma=gamma,
+            theta=theta,
+            vega=vega,
+            rho=rho,
             implied_volatility=volatility
         )
 
+    @staticmethod
+    def calculate_greeks_batch(
+        spot_price,
+        strike_prices,
+        times_to_expiry,  # in years
+        risk_free_rate=0.05,
+        volatility=0.25,
+        is_call=True,
+        use_lookup_table=False
+    ) -> dict:
+        """Calculate Black-Scholes Greeks for many options at once
+
+        All arguments may be scalars or NumPy arrays and are broadcast against
+        each other, so a whole option chain is priced with one ufunc call per
+        term instead of one Python call per strike. With use_lookup_table the
+        normal CDF comes from fast_ndtr (~1e-6 accuracy) instead of ndtr.
+        """
+        # Imported lazily so the CLI starts without loading scipy
+        from scipy.special import ndtr
+        cdf = fast_ndtr if use_lookup_table else ndtr
+        
+        S = np.asarray(spot_price, dtype=np.float64)
+        K = np.asarray(strike_prices, dtype=np.float64)
+        T = np.asarray(times_to_expiry, dtype=np.float64)
+        r = np.asarray(risk_free_rate, dtype=np.float64)
+        sigma = np.asarray(volatility, dtype=np.float64)
+        is_call = np.asarray(is_call, dtype=bool)
+
+        # Calculate d1 and d2
+        sqrt_T = np.sqrt(T)
+        sigma_sqrt_T = sigma * sqrt_T
+        d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+        d2 = d1 - sigma_sqrt_T
+
+        # Standard normal CDF and PDF
+        N_d1 = cdf(d1)
+        N_d2 = cdf(d2)
+        n_d1 = 0.3989422804014327 * np.exp(-0.5 * d1 * d1)
+
+        # Call terms use N(d2), put terms use -N(-d2) = N(d2) - 1
+        discounted_strike = K * np.exp(-r * T)
+        signed_N_d2 = np.where(is_call, N_d2, N_d2 - 1)
+
+        delta = np.where(is_call, N_d1, N_d1 - 1)
+        theta = (-(S * n_d1 * sigma) / (2 * sqrt_T) - r * discounted_strike * signed_N_d2) / 365
+        rho = T * discounted_strike * signed_N_d2 / 100
+        gamma = n_d1 / (S * sigma_sqrt_T)
+        vega = S * n_d1 * sqrt_T / 100
+        price = S * delta - discounted_strike * signed_N_d2
+
+        return {
+            "price": price,
+            "delta": delta,
+            "gamma": gamma,
+            "theta": theta,
+            "vega": vega,
+            "rho": rho,
+            "implied_volatility": np.broadcast_to(sigma, delta.shape)
+        }
+
+POLYGON_BASE_URL = "https://api.polygon.io"
+
+# Process-wide HTTP client shared by every PolygonMCPClient, so connections
+# (and their TLS sessions) are pooled across instances
+_shared_client: Optional[httpx.AsyncClient] = None
+_shared_client_lock = asyncio.Lock()
+
+async def _get_shared_client() -> httpx.AsyncClient:
+    """Return the shared Polygon HTTP client, creating it on first use"""
+    global _shared_client
+    if _shared_client is None:
+        async with _shared_client_lock:
+            if _shared_client is None:
+                # Limits and HTTP/2 live on the transport because it also handles retries
+                _shared_client = httpx.AsyncClient(
+                    base_url=POLYGON_BASE_URL,
+                    timeout=httpx.Timeout(10.0, connect=3.0),
+                    transport=httpx.AsyncHTTPTransport(
+                        http2=True,
+                        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                        retries=2
+                    )
+                )
+    return _shared_client
+
+async def close_shared_client():
+    """Close the shared Polygon HTTP client (call once on shutdown)"""
+    global _shared_client
+    if _shared_client is not None:
+        client, _shared_client = _shared_client, None
+        await client.aclose()
+
+class PolygonRequestError(Exception):
+    """Raised when a Polygon request returns an error payload"""
+
 class PolygonMCPClient:
     """Client for interacting with Polygon.io API through MCP-like interface"""
     
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.base_url = "https://api.polygon.io"
-        self.client = httpx.AsyncClient()
         self.bs_calculator = BlackScholesCalculator()
+        self._price_cache = {}  # symbol -> (fetched_at, stock_data)
     
     async def get_stock_price(self, symbol: str) -> dict:
         """Get current stock price"""
         try:
-            url = f"{self.base_url}/v2/aggs/ticker/{symbol}/prev"
+            url = f"/v2/aggs/ticker/{symbol}/prev"
             params = {"apikey": self.api_key}
-            response = await self.client.get(url, params=params)
+            client = await _get_shared_client()
+            response = await client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if data.get("results") and len(data["results"]) > 0:
                 result = data["results"][0]
@@ -122,10 +296,33 @@ class PolygonMCPClient:
         except Exception as e:
             return {"error": f"Failed to get price for {symbol}: {str(e)}"}
     
+    async def get_cached_stock_price(self, symbol: str) -> dict:
+        """Get current stock price, reusing a quote fetched within PRICE_CACHE_TTL"""
+        now = time.monotonic()
+        cached = self._price_cache.get(symbol)
+        if cached and now - cached[0] < PRICE_CACHE_TTL:
+            return cached[1]
+        
+        stock_data = await self.get_stock_price(symbol)
+        if "error" not in stock_data:
+            if len(self._price_cache) >= PRICE_CACHE_SIZE:
+                # Evict the oldest entry (dicts keep insertion order)
+                self._price_cache.pop(next(iter(self._price_cache)))
+            self._price_cache[symbol] = (now, stock_data)
+        return stock_data
+    
+    @staticmethod
+    async def _checked(request) -> dict:
+        """Await a Polygon request, raising PolygonRequestError on an error payload"""
+        data = await request
+        if "error" in data:
+            raise PolygonRequestError(data["error"])
+        return data
+    
     async def get_option_chain(self, symbol: str, expiration_date: Optional[str] = None) -> dict:
         """Get option chain data"""
         try:
-            url = f"{self.base_url}/v3/reference/options/contracts"
+            url = "/v3/reference/options/contracts"
             params = {
                 "underlying_ticker": symbol,
                 "apikey": self.api_key,
@@ -134,21 +331,27 @@ class PolygonMCPClient:
             if expiration_date:
                 params["expiration_date"] = expiration_date
             
-            response = await self.client.get(url, params=params)
+            client = await _get_shared_client()
+            response = await client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
+            results = data.get("results") or []
             return {
                 "symbol": symbol,
-                "options": data.get("results", []),
-                "count": len(data.get("results", []))
+                "options": results,
+                "count": len(results)
             }
         except Exception as e:
             return {"error": f"Failed to get option chain for {symbol}: {str(e)}"}
     
     async def get_today_date(self) -> str:
         """Get today's date"""
-        return datetime.now().strftime("%Y-%m-%d")
+        global _today_cache
+        now = time.monotonic()
+        if now - _today_cache[0] >= TODAY_CACHE_TTL:
+            _today_cache = (now, datetime.now().strftime("%Y-%m-%d"))
+        return _today_cache[1]
     
     async def calculate_option_greeks(
         self, 
@@ -161,15 +364,15 @@ class PolygonMCPClient:
         """Calculate Greeks for a specific option"""
         try:
             # Get current stock price
-            stock_data = await self.get_stock_price(symbol)
+            stock_data = await self.get_cached_stock_price(symbol)
             if "error" in stock_data:
                 return stock_data
             
             spot_price = stock_data["price"]
             
             # Calculate time to expiry
-            expiry = datetime.strptime(expiration_date, "%Y-%m-%d")
-            today = datetime.now()
+            expiry = date(int(expiration_date[0:4]), int(expiration_date[5:7]), int(expiration_date[8:10]))
+            today = date.today()
             time_to_expiry = (expiry - today).days / 365.0
             
             if time_to_expiry <= 0:
@@ -179,15 +382,30 @@ class PolygonMCPClient:
             if volatility is None:
                 volatility = 0.25  # 25% default
             
-            # Calculate Greeks
-            greeks = self.bs_calculator.calculate_greeks(
-                spot_price=spot_price,
-                strike_price=strike_price,
-                time_to_expiry=time_to_expiry,
-                volatility=volatility,
-                option_type=option_type
-            )
+            # Normalize the option type once for the calculator
+            is_call = 1 if option_type[:1].lower() == "c" else 0
             
+            # Calculate Greeks - a list of strikes is priced in one vectorized pass
+            if np.ndim(strike_price) > 0:
+                batch = self.bs_calculator.calculate_greeks_batch(
+                    spot_price=spot_price,
+                    strike_prices=strike_price,
+                    times_to_expiry=time_to_expiry,
+                    volatility=volatility,
+                    is_call=is_call
+                )
+                greeks = {name: np.round(values, 4).tolist() for name, values in batch.items()}
+            else:
+                greeks = self.bs_calculator.calculate_greeks(
+                    spot_price=spot_price,
+                    strike_price=strike_price,
+                    time_to_expiry=time_to_expiry,
+                    volatility=volatility,
+                    is_call=is_call
+                )
+                # Round once for display; the calculator keeps full precision
+                greeks = {name: round(value, 4) for name, value in greeks.model_dump().items()}
+
             return {
                 "symbol": symbol,
                 "strike_price": strike_price,
@@ -195,7 +413,7 @@ class PolygonMCPClient:
                 "option_type": option_type,
                 "spot_price": spot_price,
                 "time_to_expiry_days": round(time_to_expiry * 365),
-                "greeks": greeks.dict(),
+                "greeks": greeks,
                 "note": f"Greeks calculated using Black-Scholes model with {volatility*100}% volatility assumption"
             }
         except Exception as e:
@@ -204,24 +422,84 @@ class PolygonMCPClient:
     async def analyze_option_strategy(self, symbol: str, strategy_type: str = "covered_call") -> dict:
         """Analyze common option strategies"""
         try:
-            # Get current stock price and option chain
-            stock_data = await self.get_stock_price(symbol)
-            options_data = await self.get_option_chain(symbol)
+            # Get current stock price and option chain concurrently; if either
+            # fails the TaskGroup cancels the request still in flight
+            fetch_failed = False
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    price_task = tg.create_task(self._checked(self.get_stock_price(symbol)))
+                    chain_task = tg.create_task(self._checked(self.get_option_chain(symbol)))
+            except* PolygonRequestError:
+                fetch_failed = True
             
-            if "error" in stock_data or "error" in options_data:
+            if fetch_failed:
                 return {"error": "Could not fetch required data for strategy analysis"}
             
+            stock_data, options_data = price_task.result(), chain_task.result()
+            
             spot_price = stock_data["price"]
             
             # Simple covered call analysis
             if strategy_type == "covered_call":
-                # Find ATM and OTM call options
+                # Price a grid of ATM-to-OTM calls at the nearest listed expiration
+                today = date.today()
+                expirations = sorted(
+                    option["expiration_date"] for option in options_data["options"]
+                    if option.get("contract_type") == "call" and option.get("expiration_date", "") > today.isoformat()
+                )
+                if expirations:
+                    expiration_date = expirations[0]
+                    expiry = date(int(expiration_date[0:4]), int(expiration_date[5:7]), int(expiration_date[8:10]))
+                    days_to_expiry = (expiry - today).days
+                else:
+                    expiration_date = None
+                    days_to_expiry = 30  # No listed calls - assume a monthly contract
+                
+                strikes = np.linspace(spot_price, spot_price * 1.15, 16)
+                grid = self.bs_calculator.calculate_greeks_batch(
+                    spot_price=spot_price,
+                    strike_prices=strikes,
+                    times_to_expiry=days_to_expiry / 365.0,
+                    is_call=True
+                )
+                
+                # Take the highest premium among strikes within the delta cap; if
+                # every strike is above the cap, use the one closest to it
+                eligible = np.flatnonzero(grid["delta"] <= COVERED_CALL_MAX_DELTA)
+                if eligible.size:
+                    best = int(eligible[np.argmax(grid["price"][eligible])])
+                else:
+                    best = int(np.argmin(np.abs(grid["delta"] - COVERED_CALL_MAX_DELTA)))
+                
+                recommendation = (
+                    f"Consider selling the ${strikes[best]:.2f} call "
+                    f"({strikes[best] / spot_price - 1:.1%} out of the money)"
+                )
+                if eligible.size:
+                    recommendation += f", the richest strike with delta at or below {COVERED_CALL_MAX_DELTA:.2f}"
+                else:
+                    recommendation += (
+                        f"; no strike up to 15% out of the money has delta at or below "
+                        f"{COVERED_CALL_MAX_DELTA:.2f}, so this is the closest"
+                    )
+                
                 analysis = {
                     "strategy": "Covered Call",
                     "current_stock_price": spot_price,
-                    "recommendation": f"Consider selling call options with strikes 5-10% above current price (${spot_price * 1.05:.2f} - ${spot_price * 1.10:.2f})",
+                    "expiration_date": expiration_date,
+                    "days_to_expiry": days_to_expiry,
+                    "suggested_strike": round(float(strikes[best]), 2),
+                    "suggested_premium": round(float(grid["price"][best]), 2),
+                    "suggested_delta": round(float(grid["delta"][best]), 4),
+                    "strike_scan": {
+                        "strikes": np.round(strikes, 2).tolist(),
+                        "premiums": np.round(grid["price"], 2).tolist(),
+                        "deltas": np.round(grid["delta"], 4).tolist()
+                    },
+                    "recommendation": recommendation,
                     "risk": "Limited upside if stock rises above strike price",
-                    "reward": "Premium income + potential capital gains up to strike price"
+                    "reward": "Premium income + potential capital gains up to strike price",
+                    "note": "Premiums are theoretical Black-Scholes values with a 25% volatility assumption"
                 }
                 return analysis
             
@@ -231,8 +509,77 @@ class PolygonMCPClient:
             return {"error": f"Failed to analyze strategy: {str(e)}"}
     
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Release this client; the shared HTTP pool stays open for other instances
+        
+        The pool itself is closed once, at process shutdown, by close_shared_client.
+        """
+
+# System prompt for the agent
+SYSTEM_PROMPT = (
+    "You are an expert financial analyst and options trader. Note that when using Polygon tools, prices are already stock split adjusted. "
+    "Use the latest data available. Always double check your math. "
+    "For any questions about the current date, use the 'get_today_date' tool. "
+    "For long or complex queries, break the query into logical subtasks and process each subtask in order. "
+    "When asked about option chains, provide clear information about strikes, expirations, and pricing. "
+    "You can calculate Greeks (delta, gamma, theta, vega, rho) using the Black-Scholes model with the 'calculate_option_greeks' tool. "
+    "You can also analyze option strategies like covered calls using the 'analyze_option_strategy' tool. "
+    "When calculating Greeks, always mention that they are theoretical values based on Black-Scholes assumptions."
+)
+
+MODEL_NAME = 'claude-3-5-sonnet-20241022'
+
+# Polygon client for the query currently being processed; tools resolve it at
+# call time so a single cached Agent can serve every MarketParserAgent
+_current_polygon_client: ContextVar[PolygonMCPClient] = ContextVar("polygon_client")
+
+@lru_cache(maxsize=1)
+def _build_agent(model_name: str) -> Agent:
+    """Create the Anthropic model, agent and tools once per process"""
+    # API key is read from environment
+    model = AnthropicModel(model_name)
+    
+    # Create the agent
+    agent = Agent(
+        model=model,
+        system_prompt=SYSTEM_PROMPT,
+        retries=2,
+    )
+    
+    # Define and register tools
+    @agent.tool_plain
+    async def get_stock_price(symbol: str) -> dict:
+        """Get current stock price for a symbol"""
+        return await _current_polygon_client.get().get_stock_price(symbol.upper())
+    
+    @agent.tool_plain
+    async def get_option_chain(symbol: str, expiration_date: Optional[str] = None) -> dict:
+        """Get option chain for a symbol"""
+        return await _current_polygon_client.get().get_option_chain(symbol.upper(), expiration_date)
+    
+    @agent.tool_plain
+    async def get_today_date() -> str:
+        """Get today's date"""
+        return await _current_polygon_client.get().get_today_date()
+    
+    @agent.tool_plain
+    async def calculate_option_greeks(
+        symbol: str, 
+        strike_price: float, 
+        expiration_date: str,
+        option_type: str = "call",
+        volatility: Optional[float] = None
+    ) -> dict:
+        """Calculate Greeks (delta, gamma, theta, vega, rho) for a specific option using Black-Scholes model"""
+        return await _current_polygon_client.get().calculate_option_greeks(
+            symbol, strike_price, expiration_date, option_type, volatility
+        )
+    
+    @agent.tool_plain
+    async def analyze_option_strategy(symbol: str, strategy_type: str = "covered_call") -> dict:
+        """Analyze common option strategies like covered calls, protective puts, etc."""
+        return await _current_polygon_client.get().analyze_option_strategy(symbol, strategy_type)
+    
+    return agent
 
 class MarketParserAgent:
     """Main agent for processing market queries"""
@@ -240,75 +587,20 @@ class MarketParserAgent:
     def __init__(self, anthropic_api_key: str, polygon_api_key: str):
         self.polygon_client = PolygonMCPClient(polygon_api_key)
         
-        # Initialize the Anthropic model - API key is read from environment
         # Set the API key in environment for the model to use
-        import os
         os.environ['ANTHROPIC_API_KEY'] = anthropic_api_key
-        self.model = AnthropicModel('claude-3-5-sonnet-20241022')
-        
-        # System prompt for the agent
-        system_prompt = (
-            "You are an expert financial analyst and options trader. Note that when using Polygon tools, prices are already stock split adjusted. "
-            "Use the latest data available. Always double check your math. "
-            "For any questions about the current date, use the 'get_today_date' tool. "
-            "For long or complex queries, break the query into logical subtasks and process each subtask in order. "
-            "When asked about option chains, provide clear information about strikes, expirations, and pricing. "
-            "You can calculate Greeks (delta, gamma, theta, vega, rho) using the Black-Scholes model with the 'calculate_option_greeks' tool. "
-            "You can also analyze option strategies like covered calls using the 'analyze_option_strategy' tool. "
-            "When calculating Greeks, always mention that they are theoretical values based on Black-Scholes assumptions."
-        )
-        
-        # Create the agent
-        self.agent = Agent(
-            model=self.model,
-            system_prompt=system_prompt,
-            retries=2,
-        )
-        
-        # Store polygon client reference for tools
-        polygon_client = self.polygon_client
-        
-        # Define and register tools
-        @self.agent.tool_plain
-        async def get_stock_price(symbol: str) -> dict:
-            """Get current stock price for a symbol"""
-            return await polygon_client.get_stock_price(symbol.upper())
-        
-        @self.agent.tool_plain
-        async def get_option_chain(symbol: str, expiration_date: Optional[str] = None) -> dict:
-            """Get option chain for a symbol"""
-            return await polygon_client.get_option_chain(symbol.upper(), expiration_date)
-        
-        @self.agent.tool_plain
-        async def get_today_date() -> str:
-            """Get today's date"""
-            return await polygon_client.get_today_date()
-        
-        @self.agent.tool_plain
-        async def calculate_option_greeks(
-            symbol: str, 
-            strike_price: float, 
-            expiration_date: str,
-            option_type: str = "call",
-            volatility: Optional[float] = None
-        ) -> dict:
-            """Calculate Greeks (delta, gamma, theta, vega, rho) for a specific option using Black-Scholes model"""
-            return await polygon_client.calculate_option_greeks(
-                symbol, strike_price, expiration_date, option_type, volatility
-            )
-        
-        @self.agent.tool_plain
-        async def analyze_option_strategy(symbol: str, strategy_type: str = "covered_call") -> dict:
-            """Analyze common option strategies like covered calls, protective puts, etc."""
-            return await polygon_client.analyze_option_strategy(symbol, strategy_type)
+        self.agent = _build_agent(MODEL_NAME)
     
     async def process_query(self, query: str) -> str:
         """Process a natural language market query"""
+        token = _current_polygon_client.set(self.polygon_client)
         try:
             result = await self.agent.run(query)
             return result.data if hasattr(result, 'data') else str(result)
         except Exception as e:
             return f"Error processing query: {str(e)}"
+        finally:
+            _current_polygon_client.reset(token)
     
     async def close(self):
         """Close connections"""
@@ -377,6 +669,7 @@ async def main():
     
     finally:
         await agent.close()
+        await close_shared_client()
 
 if __name__ == "__main__":
     try:
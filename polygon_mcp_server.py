@@ -8,24 +8,94 @@ with advanced options analytics, Greeks calculation, and real-time market data.
 import os
 import asyncio
 import math
-from datetime import datetime, timedelta
+import time
+import itertools
+import operator
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, List, Any
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
 
 import httpx
 import numpy as np
-from scipy.stats import norm
+import orjson
 from dotenv import load_dotenv
 from polygon import RESTClient
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional - fall back to the plain Python kernel
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 # Load environment variables
 load_dotenv()
 
 # Initialize FastMCP server
 mcp = FastMCP("Polygon.io Advanced Options MCP Server")
 
+POLYGON_BASE_URL = "https://api.polygon.io"
+
+# How long polygon responses are reused, in seconds, and how many are kept
+QUOTE_CACHE_TTL = 5.0
+CONTRACTS_CACHE_TTL = 300.0
+RESPONSE_CACHE_SIZE = 256
+
+# Rows returned by get_options_chain; pagination stops once these are reached
+CONTRACTS_LIMIT = 50
+SNAPSHOTS_LIMIT = 20
+_CONTRACT_FIELDS = operator.itemgetter("ticker", "strike_price", "expiration_date", "contract_type")
+
+_INV_SQRT_2PI = 0.3989422804014327  # 1/sqrt(2*pi)
+_INV_SQRT2 = 0.7071067811865476     # 1/sqrt(2)
+_INV_365 = 1.0 / 365.0               # per-day theta
+
+@njit(cache=True, fastmath=True)
+def _npdf(x):
+    """Standard normal PDF for a scalar"""
+    return math.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+@njit(cache=True, fastmath=True)
+def _ncdf(x):
+    """Standard normal CDF for a scalar (erf form, lowered to libm by numba)"""
+    return 0.5 * (1.0 + math.erf(x * _INV_SQRT2))
+
+@njit(cache=True, fastmath=True)
+def _bs_greeks(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes kernel returning (delta, gamma, theta, vega, rho)"""
+    
+    # Shared subexpressions
+    sqrtT = math.sqrt(time_to_expiry)
+    vol_sqrtT = volatility * sqrtT
+    half_var = 0.5 * volatility * volatility
+    disc = math.exp(-risk_free_rate * time_to_expiry)
+    
+    # Black-Scholes calculations
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + half_var) * time_to_expiry) / vol_sqrtT
+    d2 = d1 - vol_sqrtT
+    nd1 = _npdf(d1)
+    
+    # Greeks calculations (cdf_d2 is N(d2) for calls, N(-d2) for puts)
+    if is_call:
+        cdf_d2 = _ncdf(d2)
+        delta = _ncdf(d1)
+        rho = strike_price * time_to_expiry * disc * cdf_d2 * 0.01
+    else:  # put
+        cdf_d2 = _ncdf(-d2)
+        delta = -_ncdf(-d1)
+        rho = -strike_price * time_to_expiry * disc * cdf_d2 * 0.01
+    
+    gamma = nd1 / (spot_price * vol_sqrtT)
+    theta = (-(spot_price * nd1 * volatility) / (2 * sqrtT) - 
+            risk_free_rate * strike_price * disc * cdf_d2) * _INV_365
+    vega = spot_price * nd1 * sqrtT * 0.01
+    
+    return delta, gamma, theta, vega, rho
+
+# Compile the kernel at import so the first tool call doesn't pay for it
+_bs_greeks(100.0, 100.0, 1.0, 0.05, 0.25, True)
+
 class OptionsGreeks:
     """Advanced Options Greeks calculator using Black-Scholes model"""
     
@@ -50,56 +120,132 @@ class OptionsGreeks:
                 "implied_volatility": volatility
             }
         
-        # Black-Scholes calculations
-        d1 = (np.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / (volatility * np.sqrt(time_to_expiry))
-        d2 = d1 - volatility * np.sqrt(time_to_expiry)
+        delta, gamma, theta, vega, rho = _bs_greeks(
+            spot_price, strike_price, time_to_expiry, risk_free_rate, volatility,
+            option_type.lower() == "call"
+        )
         
-        # Greeks calculations
-        if option_type.lower() == "call":
-            delta = norm.cdf(d1)
-            rho = strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2) / 100
-        else:  # put
-            delta = -norm.cdf(-d1)
-            rho = -strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) / 100
+        # Full precision; the MCP tool templates format to 4 decimals
+        return {
+            "delta": delta,
+            "gamma": gamma,
+            "theta": theta,
+            "vega": vega,
+            "rho": rho,
+            "implied_volatility": volatility
+        }
+    
+    @staticmethod
+    def calculate_greeks_vec(
+        spot_price: float,
+        strike_prices: np.ndarray,
+        times_to_expiry: np.ndarray,  # in years
+        risk_free_rate: float,
+        volatilities: np.ndarray,
+        is_call: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Calculate Greeks for many options at once with NumPy arrays"""
+        # Deferred so server startup doesn't pay for the scipy import
+        from scipy.special import ndtr
+        
+        S = np.asarray(spot_price, dtype=np.float64)
+        K = np.asarray(strike_prices, dtype=np.float64)
+        T = np.asarray(times_to_expiry, dtype=np.float64)
+        r = np.asarray(risk_free_rate, dtype=np.float64)
+        sigma = np.asarray(volatilities, dtype=np.float64)
+        is_call = np.asarray(is_call, dtype=bool)
+        phi = np.where(is_call, 1.0, -1.0)  # +1 for calls, -1 for puts
         
-        gamma = norm.pdf(d1) / (spot_price * volatility * np.sqrt(time_to_expiry))
-        theta = (-(spot_price * norm.pdf(d1) * volatility) / (2 * np.sqrt(time_to_expiry)) - 
-                risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * 
-                (norm.cdf(d2) if option_type.lower() == "call" else norm.cdf(-d2))) / 365
-        vega = spot_price * norm.pdf(d1) * np.sqrt(time_to_expiry) / 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sqrtT = np.sqrt(T)
+            vol_sqrtT = sigma * sqrtT
+            disc = np.exp(-r * T)
+            
+            d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_sqrtT
+            d2 = d1 - vol_sqrtT
+            nd1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+            cdf_d2 = ndtr(phi * d2)  # N(d2) for calls, N(-d2) for puts
+            
+            delta = phi * ndtr(phi * d1)
+            gamma = nd1 / (S * vol_sqrtT)
+            theta = (-(S * nd1 * sigma) / (2 * sqrtT) - r * K * disc * cdf_d2) * _INV_365
+            vega = S * nd1 * sqrtT * 0.01
+            rho = phi * K * T * disc * cdf_d2 * 0.01
         
+        # Same expiry handling as calculate_greeks
+        live = T > 0
         return {
-            "delta": round(delta, 4),
-            "gamma": round(gamma, 4),
-            "theta": round(theta, 4),
-            "vega": round(vega, 4),
-            "rho": round(rho, 4),
-            "implied_volatility": volatility
+            "delta": np.where(live, delta, np.where(is_call & (S > K), 1.0, 0.0)),
+            "gamma": np.where(live, gamma, 0.0),
+            "theta": np.where(live, theta, 0.0),
+            "vega": np.where(live, vega, 0.0),
+            "rho": np.where(live, rho, 0.0),
+            "implied_volatility": np.broadcast_to(sigma, live.shape)
         }
 
+def _parse_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD date by slicing, much cheaper than strptime"""
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+def _date_ordinal(value: str) -> int:
+    """Day ordinal of a YYYY-MM-DD date, for integer day arithmetic"""
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+
 class PolygonMCPClient:
     """Enhanced Polygon.io client with MCP integration"""
     
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.client = RESTClient(api_key)
-        self.http_client = httpx.AsyncClient()
+        self.http_client = httpx.AsyncClient(
+            base_url=POLYGON_BASE_URL,
+            http2=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            headers={"Authorization": f"Bearer {api_key}"}
+        )
         self.greeks_calculator = OptionsGreeks()
+        self._response_cache: Dict[tuple, tuple] = {}
+    
+    async def _cached_fetch(self, key: tuple, ttl: float, fetch, *args, **kwargs) -> Any:
+        """Await fetch(*args, **kwargs), reusing results younger than ttl seconds"""
+        hit = self._response_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < ttl:
+            return hit[1]
+        
+        result = await fetch(*args, **kwargs)
+        # Empty results (e.g. no previous close yet) are retried on the next call
+        if result:
+            # Re-inserting moves the key to the end; when full, the oldest entry goes
+            self._response_cache.pop(key, None)
+            if len(self._response_cache) >= RESPONSE_CACHE_SIZE:
+                self._response_cache.pop(next(iter(self._response_cache)))
+            self._response_cache[key] = (time.monotonic(), result)
+        return result
+    
+    async def _get_json(self, path: str, **params) -> Any:
+        """GET a Polygon endpoint on the shared client and return the response's results"""
+        response = await self.http_client.get(path, params=params or None)
+        response.raise_for_status()
+        return response.json().get("results")
     
     async def get_stock_price(self, symbol: str) -> Dict[str, Any]:
         """Get current stock price with enhanced data"""
         try:
-            # Get previous close
-            prev_close = self.client.get_previous_close_agg(symbol)
-            
-            # Get last trade
-            last_trade = self.client.get_last_trade(symbol)
+            # Get previous close and last trade concurrently; the previous close
+            # goes over the pooled HTTP client, while the synchronous SDK call
+            # runs in a worker thread
+            prev_close, last_trade = await asyncio.gather(
+                self._cached_fetch(("prev_close", symbol.upper()), QUOTE_CACHE_TTL,
+                                   self._get_json, f"/v2/aggs/ticker/{symbol.upper()}/prev"),
+                asyncio.to_thread(self.client.get_last_trade, symbol)
+            )
             
             return {
                 "symbol": symbol.upper(),
-                "price": prev_close[0].close if prev_close else None,
-                "last_trade_price": last_trade.price if hasattr(last_trade, 'price') else None,
-                "volume": prev_close[0].volume if prev_close else None,
+                "price": prev_close[0]["c"] if prev_close else None,
+                "last_trade_price": getattr(last_trade, 'price', None),
+                "volume": prev_close[0]["v"] if prev_close else None,
                 "timestamp": datetime.now().isoformat(),
                 "status": "success"
             }
@@ -109,46 +255,65 @@ class PolygonMCPClient:
     async def get_options_chain(self, symbol: str, expiration_date: Optional[str] = None) -> Dict[str, Any]:
         """Get comprehensive options chain with enhanced data"""
         try:
-            params = {"underlying_ticker": symbol.upper()}
+            params = {"underlying_ticker": symbol.upper(), "limit": CONTRACTS_LIMIT}
             if expiration_date:
                 params["expiration_date"] = expiration_date
             
-            # Get options contracts
-            contracts = list(self.client.list_options_contracts(**params))
-            
             # Get options snapshots for real-time data
-            try:
-                snapshots = list(self.client.list_snapshot_options_chain(symbol.upper()))
-            except:
-                snapshots = []
+            def fetch_snapshots():
+                try:
+                    return list(itertools.islice(
+                        self.client.list_snapshot_options_chain(symbol.upper(), params={"limit": SNAPSHOTS_LIMIT}),
+                        SNAPSHOTS_LIMIT
+                    ))
+                except:
+                    return []
+            
+            # Get options contracts; only one page of CONTRACTS_LIMIT is used,
+            # so a single request on the pooled HTTP client covers it. The SDK
+            # is synchronous and paginates while iterating, so the snapshots
+            # run in a worker thread instead of blocking the event loop
+            contracts, snapshots = await asyncio.gather(
+                self._cached_fetch(("contracts", symbol.upper(), expiration_date), CONTRACTS_CACHE_TTL,
+                                   self._get_json, "/v3/reference/options/contracts", **params),
+                asyncio.to_thread(fetch_snapshots)
+            )
+            
+            # Build the rows with one lookup per field
+            contracts = contracts or []
+            contract_rows = []
+            for contract in contracts:
+                ticker, strike, expiry, contract_type = _CONTRACT_FIELDS(contract)
+                contract_rows.append({
+                    "ticker": ticker,
+                    "strike_price": strike,
+                    "expiration_date": expiry,
+                    "contract_type": contract_type,
+                    "exercise_style": contract.get('exercise_style', 'american'),
+                    "shares_per_contract": contract.get('shares_per_contract', 100)
+                })
+            
+            snapshot_rows = []
+            for snap in snapshots:
+                lq = getattr(snap, 'last_quote', None)
+                snapshot_rows.append({
+                    "ticker": getattr(snap, 'ticker', None),
+                    "last_quote": {
+                        "bid": lq.bid if lq else None,
+                        "ask": lq.ask if lq else None,
+                        "bid_size": lq.bid_size if lq else None,
+                        "ask_size": lq.ask_size if lq else None,
+                    },
+                    "open_interest": getattr(snap, 'open_interest', None),
+                    "volume": getattr(snap, 'volume', None)
+                })
             
             return {
                 "symbol": symbol.upper(),
                 "expiration_date": expiration_date,
                 "contracts_count": len(contracts),
-                "contracts": [
-                    {
-                        "ticker": contract.ticker,
-                        "strike_price": contract.strike_price,
-                        "expiration_date": contract.expiration_date,
-                        "contract_type": contract.contract_type,
-                        "exercise_style": getattr(contract, 'exercise_style', 'american'),
-                        "shares_per_contract": getattr(contract, 'shares_per_contract', 100)
-                    } for contract in contracts[:50]  # Limit to first 50 for performance
-                ],
-                "snapshots": [
-                    {
-                        "ticker": snap.ticker if hasattr(snap, 'ticker') else None,
-                        "last_quote": {
-                            "bid": snap.last_quote.bid if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "ask": snap.last_quote.ask if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "bid_size": snap.last_quote.bid_size if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "ask_size": snap.last_quote.ask_size if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                        },
-                        "open_interest": getattr(snap, 'open_interest', None),
-                        "volume": getattr(snap, 'volume', None)
-                    } for snap in snapshots[:20]  # Limit snapshots
-                ],
+                "contracts": contract_rows,
+                "snapshots": snapshot_rows,
                 "timestamp": datetime.now().isoformat(),
                 "status": "success"
             }
@@ -174,9 +339,10 @@ class PolygonMCPClient:
             if not spot_price:
                 return {"error": "Could not get current stock price", "status": "error"}
             
-            # Calculate time to expiry
-            exp_date = datetime.strptime(expiration_date, "%Y-%m-%d")
-            time_to_expiry = (exp_date - datetime.now()).days / 365.0
+            # Calculate time to expiry; the same clock reading stamps the response
+            now = datetime.now()
+            exp_date = _parse_date(expiration_date)
+            time_to_expiry = (exp_date - now).days / 365.0
             
             if time_to_expiry < 0:
                 return {"error": "Option has already expired", "status": "error"}
@@ -203,7 +369,7 @@ class PolygonMCPClient:
                 "time_to_expiry_years": round(time_to_expiry, 4),
                 "time_to_expiry_days": round(time_to_expiry * 365, 0),
                 "greeks": greeks,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
                 "status": "success"
             }
         except Exception as e:
@@ -213,8 +379,9 @@ class PolygonMCPClient:
         """Detect unusual options activity"""
         try:
             # Get recent options trades
-            today = datetime.now().strftime("%Y-%m-%d")
-            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+            now = datetime.now()
+            today = now.strftime("%Y-%m-%d")
+            yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
             
             # This would require more sophisticated analysis in a real implementation
             # For now, we'll return a placeholder structure
@@ -227,7 +394,7 @@ class PolygonMCPClient:
                     "unusual_iv_spikes": [],
                     "put_call_ratio": None
                 },
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
                 "status": "success",
                 "note": "Advanced unusual activity detection requires premium data access"
             }
@@ -243,8 +410,11 @@ class PolygonMCPClient:
                 return stock_data
             
             spot_price = stock_data["price"] or stock_data["last_trade_price"]
+            if not spot_price:
+                return {"error": "Could not get current stock price", "status": "error"}
             
             # Calculate strategy metrics
+            now = datetime.now()
             strategy_analysis = {
                 "strategy_type": strategy_type,
                 "symbol": symbol.upper(),
@@ -260,28 +430,44 @@ class PolygonMCPClient:
                     "net_theta": 0,
                     "net_vega": 0
                 },
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
                 "status": "success"
             }
             
-            # Calculate net Greeks for the strategy
-            total_delta = total_gamma = total_theta = total_vega = 0
-            
+            # Net out legs on the same contract (ratio spreads, butterflies) so
+            # each distinct option is priced only once
+            positions: Dict[tuple, float] = {}
             for leg in legs:
-                greeks_data = await self.calculate_option_greeks(
-                    symbol=symbol,
-                    strike_price=leg["strike_price"],
-                    expiration_date=leg["expiration_date"],
-                    option_type=leg["option_type"],
-                    volatility=leg.get("volatility", 0.25)
+                key = (
+                    leg["strike_price"],
+                    leg["expiration_date"],
+                    leg["option_type"].lower(),
+                    0.25 if leg.get("volatility") is None else leg["volatility"]
                 )
-                
-                if "greeks" in greeks_data:
-                    multiplier = leg.get("quantity", 1) * (1 if leg.get("action") == "buy" else -1)
-                    total_delta += greeks_data["greeks"]["delta"] * multiplier
-                    total_gamma += greeks_data["greeks"]["gamma"] * multiplier
-                    total_theta += greeks_data["greeks"]["theta"] * multiplier
-                    total_vega += greeks_data["greeks"]["vega"] * multiplier
+                multiplier = leg.get("quantity", 1) * (1 if leg.get("action") == "buy" else -1)
+                positions[key] = positions.get(key, 0) + multiplier
+            
+            # Calculate net Greeks for the strategy in one vectorized pass.
+            # Whole days left exclude today's partial day, as (expiry - now).days does
+            first_full_day = now.toordinal() + 1
+            strikes = np.array([key[0] for key in positions], dtype=np.float64)
+            times_to_expiry = np.array(
+                [(_date_ordinal(key[1]) - first_full_day) / 365.0 for key in positions],
+                dtype=np.float64
+            )
+            volatilities = np.array([key[3] for key in positions], dtype=np.float64)
+            is_call = np.array([key[2] == "call" for key in positions], dtype=bool)
+            multipliers = np.fromiter(positions.values(), dtype=np.float64, count=len(positions))
+            # Expired legs don't contribute, matching calculate_option_greeks
+            multipliers[times_to_expiry < 0] = 0
+            
+            greeks = self.greeks_calculator.calculate_greeks_vec(
+                spot_price, strikes, np.maximum(times_to_expiry, 0.0), 0.05, volatilities, is_call
+            )
+            total_delta = float(greeks["delta"] @ multipliers)
+            total_gamma = float(greeks["gamma"] @ multipliers)
+            total_theta = float(greeks["theta"] @ multipliers)
+            total_vega = float(greeks["vega"] @ multipliers)
             
             strategy_analysis["analysis"]["net_delta"] = round(total_delta, 4)
             strategy_analysis["analysis"]["net_gamma"] = round(total_gamma, 4)
@@ -322,6 +508,74 @@ async def lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
 # Set lifespan for the server
 mcp.lifespan = lifespan
 
+# Response templates for the MCP tools
+_STOCK_PRICE_TMPL = """Stock Price for {symbol}:
+Price: ${price:.2f}
+Last Trade: ${last_trade_price}
+Volume: {volume:,}
+Updated: {timestamp}"""
+
+_OPTIONS_CHAIN_TMPL = """Options Chain for {symbol}:
+Contracts Found: {contracts_count}
+Expiration Filter: {expiration_date}
+
+Recent Contracts:"""
+
+_CONTRACT_LINE_TMPL = """
+  {ticker} - ${strike_price} {contract_type}
+  Expires: {expiration_date}"""
+
+_GREEKS_TMPL = """Options Greeks for {symbol} ${strike_price} {option_type}:
+
+Current Stock Price: ${spot_price:.2f}
+Time to Expiry: {time_to_expiry_days} days ({time_to_expiry_years:.4f} years)
+Expiration: {expiration_date}
+
+Greeks:
+  Delta: {delta:.4f} (price sensitivity)
+  Gamma: {gamma:.4f} (delta sensitivity)  
+  Theta: {theta:.4f} (time decay per day)
+  Vega: {vega:.4f} (volatility sensitivity)
+  Rho: {rho:.4f} (interest rate sensitivity)
+  
+Implied Volatility: {implied_volatility:.1%}
+Calculated: {timestamp}"""
+
+_STRATEGY_TMPL = """Options Strategy Analysis: {strategy_type}
+Symbol: {symbol} (Current Price: ${spot_price:.2f})
+
+Strategy Legs: {leg_count}
+Net Greeks:
+  Delta: {net_delta:.4f}
+  Gamma: {net_gamma:.4f}
+  Theta: {net_theta:.4f}
+  Vega: {net_vega:.4f}
+
+Max Profit: {max_profit}
+Max Loss: {max_loss}
+Breakeven Points: {breakeven_points}
+
+Analysis Date: {timestamp}"""
+
+_UNUSUAL_ACTIVITY_TMPL = """Unusual Options Activity for {symbol}:
+Analysis Date: {analysis_date}
+
+High Volume Contracts: {high_volume_count}
+Large Block Trades: {block_trade_count}
+IV Spikes: {iv_spike_count}
+Put/Call Ratio: {put_call_ratio}
+
+{note}
+Updated: {timestamp}"""
+
+_MARKET_STATUS_TMPL = """Market Status:
+Market: {status.market}
+Server Time: {status.serverTime}
+Exchanges:
+  NYSE: {status.exchanges.nyse}
+  NASDAQ: {status.exchanges.nasdaq}
+  OTC: {status.exchanges.otc}"""
+
 # MCP Tools
 @mcp.tool()
 async def get_stock_price(symbol: str) -> str:
@@ -337,11 +591,7 @@ async def get_stock_price(symbol: str) -> str:
     result = await polygon_client.get_stock_price(symbol)
     
     if result["status"] == "success":
-        return f"""Stock Price for {result['symbol']}:
-Price: ${result['price']:.2f}
-Last Trade: ${result.get('last_trade_price', 'N/A')}
-Volume: {result.get('volume', 'N/A'):,}
-Updated: {result['timestamp']}"""
+        return _STOCK_PRICE_TMPL.format_map(result)
     else:
         return f"Error getting stock price for {symbol}: {result.get('error', 'Unknown error')}"
 
@@ -360,16 +610,14 @@ async def get_options_chain(symbol: str, expiration_date: Optional[str] = None)
     result = await polygon_client.get_options_chain(symbol, expiration_date)
     
     if result["status"] == "success":
-        response = f"""Options Chain for {result['symbol']}:
-Contracts Found: {result['contracts_count']}
-Expiration Filter: {result.get('expiration_date', 'All dates')}
-
-Recent Contracts:"""
-        
-        for contract in result['contracts'][:10]:  # Show first 10
-            response += f"""
-  {contract['ticker']} - ${contract['strike_price']} {contract['contract_type'].upper()}
-  Expires: {contract['expiration_date']}"""
+        response = _OPTIONS_CHAIN_TMPL.format_map(result) + "".join(
+            _CONTRACT_LINE_TMPL.format(
+                ticker=contract['ticker'],
+                strike_price=contract['strike_price'],
+                contract_type=contract['contract_type'].upper(),
+                expiration_date=contract['expiration_date']
+            ) for contract in result['contracts'][:10]  # Show first 10
+        )
         
         if result['snapshots']:
             response += f"\n\nReal-time Data Available: {len(result['snapshots'])} contracts"
@@ -404,22 +652,9 @@ async def calculate_option_greeks(
     )
     
     if result["status"] == "success":
-        greeks = result["greeks"]
-        return f"""Options Greeks for {result['symbol']} ${result['strike_price']} {result['option_type'].upper()}:
-
-Current Stock Price: ${result['spot_price']:.2f}
-Time to Expiry: {result['time_to_expiry_days']} days ({result['time_to_expiry_years']:.4f} years)
-Expiration: {result['expiration_date']}
-
-Greeks:
-  Delta: {greeks['delta']:.4f} (price sensitivity)
-  Gamma: {greeks['gamma']:.4f} (delta sensitivity)  
-  Theta: {greeks['theta']:.4f} (time decay per day)
-  Vega: {greeks['vega']:.4f} (volatility sensitivity)
-  Rho: {greeks['rho']:.4f} (interest rate sensitivity)
-  
-Implied Volatility: {greeks['implied_volatility']:.1%}
-Calculated: {result['timestamp']}"""
+        return _GREEKS_TMPL.format_map(
+            {**result, **result["greeks"], "option_type": result["option_type"].upper()}
+        )
     else:
         return f"Error calculating Greeks: {result.get('error', 'Unknown error')}"
 
@@ -442,30 +677,19 @@ async def analyze_options_strategy(
         return "Error: Polygon client not initialized"
     
     try:
-        import json
-        legs_data = json.loads(legs)
-    except json.JSONDecodeError:
+        legs_data = orjson.loads(legs)
+    except orjson.JSONDecodeError:
         return "Error: Invalid JSON format for legs parameter"
     
     result = await polygon_client.analyze_options_strategy(strategy_type, symbol, legs_data)
     
     if result["status"] == "success":
-        analysis = result["analysis"]
-        return f"""Options Strategy Analysis: {result['strategy_type'].upper()}
-Symbol: {result['symbol']} (Current Price: ${result['spot_price']:.2f})
-
-Strategy Legs: {len(result['legs'])}
-Net Greeks:
-  Delta: {analysis['net_delta']:.4f}
-  Gamma: {analysis['net_gamma']:.4f}
-  Theta: {analysis['net_theta']:.4f}
-  Vega: {analysis['net_vega']:.4f}
-
-Max Profit: {analysis.get('max_profit', 'Calculating...')}
-Max Loss: {analysis.get('max_loss', 'Calculating...')}
-Breakeven Points: {analysis.get('breakeven_points', 'Calculating...')}
-
-Analysis Date: {result['timestamp']}"""
+        return _STRATEGY_TMPL.format_map({
+            **result,
+            **result["analysis"],
+            "strategy_type": result["strategy_type"].upper(),
+            "leg_count": len(result["legs"])
+        })
     else:
         return f"Error analyzing strategy: {result.get('error', 'Unknown error')}"
 
@@ -483,16 +707,17 @@ async def get_unusual_options_activity(symbol: str) -> str:
     result = await polygon_client.get_unusual_options_activity(symbol)
     
     if result["status"] == "success":
-        return f"""Unusual Options Activity for {result['symbol']}:
-Analysis Date: {result['analysis_date']}
-
-High Volume Contracts: {len(result['unusual_activity']['high_volume_contracts'])}
-Large Block Trades: {len(result['unusual_activity']['large_block_trades'])}
-IV Spikes: {len(result['unusual_activity']['unusual_iv_spikes'])}
-Put/Call Ratio: {result['unusual_activity']['put_call_ratio'] or 'Calculating...'}
-
-{result.get('note', '')}
-Updated: {result['timestamp']}"""
+        activity = result['unusual_activity']
+        return _UNUSUAL_ACTIVITY_TMPL.format(
+            symbol=result['symbol'],
+            analysis_date=result['analysis_date'],
+            high_volume_count=len(activity['high_volume_contracts']),
+            block_trade_count=len(activity['large_block_trades']),
+            iv_spike_count=len(activity['unusual_iv_spikes']),
+            put_call_ratio=activity['put_call_ratio'] or 'Calculating...',
+            note=result.get('note', ''),
+            timestamp=result['timestamp']
+        )
     else:
         return f"Error getting unusual activity for {symbol}: {result.get('error', 'Unknown error')}"
 
@@ -504,14 +729,8 @@ async def get_market_status() -> str:
         return "Error: Polygon client not initialized"
     
     try:
-        status = polygon_client.client.get_market_status()
-        return f"""Market Status:
-Market: {status.market}
-Server Time: {status.serverTime}
-Exchanges:
-  NYSE: {status.exchanges.nyse}
-  NASDAQ: {status.exchanges.nasdaq}
-  OTC: {status.exchanges.otc}"""
+        status = await asyncio.to_thread(polygon_client.client.get_market_status)
+        return _MARKET_STATUS_TMPL.format(status=status)
     except Exception as e:
         return f"Error getting market status: {str(e)}"
 
@@ -6,22 +6,215 @@ with advanced options analytics, Greeks calculation, and real-time market data.
 """
 
 import os
+import asyncio
 import math
+import functools
+import itertools
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator
 
 import httpx
 import numpy as np
-from scipy.stats import norm
+import orjson
+import polars as pl
+from scipy.special import ndtr
 from dotenv import load_dotenv
 from polygon import RESTClient
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional - fall back to the plain Python/NumPy kernels
+    NUMBA_AVAILABLE = False
+    prange = range
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+try:
+    from py_vollib.black_scholes.implied_volatility import implied_volatility as _vollib_iv
+except ImportError:  # py_vollib is optional - fall back to a bracketed root search
+    _vollib_iv = None
+
 # Load environment variables
 load_dotenv()
 
+# The client is created on server startup rather than at import, so a missing
+# API key doesn't break importing and httpx builds its pool on the running loop
+polygon_client = None
+_open_sessions = 0
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """Manage server lifecycle"""
+    global polygon_client, _open_sessions
+    
+    # Sessions share one client (and its connection pool); the first creates it
+    if polygon_client is None:
+        polygon_client = PolygonMCPClient()
+    _open_sessions += 1
+    
+    try:
+        yield {"polygon_client": polygon_client}
+    finally:
+        # The last session to end closes the pool; a later one starts afresh
+        _open_sessions -= 1
+        if not _open_sessions:
+            client, polygon_client = polygon_client, None
+            await client.close()
+
 # Initialize FastMCP server
-mcp = FastMCP("Polygon.io Advanced Options MCP Server")
+mcp = FastMCP("Polygon.io Advanced Options MCP Server", lifespan=lifespan)
+
+POLYGON_BASE_URL = "https://api.polygon.io"
+_PRICE_TTL = 1.0  # seconds a stock quote is reused before Polygon is asked again
+_SNAPSHOT_CONCURRENCY = 20  # option snapshot requests in flight per chain
+_CHAIN_SNAPSHOT_LIMIT = 250  # contracts per chain snapshot page (Polygon's maximum)
+
+_INV_SQRT2 = 1 / math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+@njit(cache=True, fastmath=True)
+def _norm_cdf(x: float) -> float:
+    """Standard normal CDF for a scalar"""
+    return 0.5 * math.erfc(-x * _INV_SQRT2)
+
+@njit(cache=True, fastmath=True)
+def _norm_pdf(x: float) -> float:
+    """Standard normal PDF for a scalar"""
+    return math.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+@njit(cache=True, fastmath=True)
+def _bs_greeks_nb(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes kernel returning (delta, gamma, theta, vega, rho)"""
+    sqrt_t = math.sqrt(time_to_expiry)
+    sigma_sqrt_t = volatility * sqrt_t
+    disc = math.exp(-risk_free_rate * time_to_expiry)
+    
+    # Black-Scholes calculations
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    pdf_d1 = _norm_pdf(d1)
+    
+    # Greeks calculations (cdf_d2 is N(d2) for calls, N(-d2) for puts)
+    if is_call:
+        delta = _norm_cdf(d1)
+        cdf_d2 = _norm_cdf(d2)
+        carry = -risk_free_rate * strike_price * disc * cdf_d2
+        rho = strike_price * time_to_expiry * disc * cdf_d2 / 100
+    else:  # put
+        delta = _norm_cdf(d1) - 1
+        cdf_d2 = _norm_cdf(-d2)
+        carry = risk_free_rate * strike_price * disc * cdf_d2
+        rho = -strike_price * time_to_expiry * disc * cdf_d2 / 100
+    
+    gamma = pdf_d1 / (spot_price * sigma_sqrt_t)
+    theta = (-spot_price * pdf_d1 * volatility / (2 * sqrt_t) + carry) / 365
+    vega = spot_price * pdf_d1 * sqrt_t / 100
+    
+    return delta, gamma, theta, vega, rho
+
+@njit(cache=True, parallel=True, fastmath=True)
+def _bs_greeks_batch_nb(spot_price, strike_prices, times_to_expiry, risk_free_rate, volatilities, is_call):
+    """Run the Black-Scholes kernel over a chain; rows are delta, gamma, theta, vega, rho"""
+    n = strike_prices.shape[0]
+    out = np.empty((5, n), dtype=np.float32)
+    for i in prange(n):
+        delta, gamma, theta, vega, rho = _bs_greeks_nb(
+            spot_price, strike_prices[i], times_to_expiry[i], risk_free_rate, volatilities[i], is_call[i]
+        )
+        out[0, i] = delta
+        out[1, i] = gamma
+        out[2, i] = theta
+        out[3, i] = vega
+        out[4, i] = rho
+    return out
+
+# Compile the scalar kernel at import so the first tool call doesn't pay for it
+_bs_greeks_nb(100.0, 100.0, 1.0, 0.05, 0.25, True)
+
+@njit(cache=True, fastmath=True)
+def _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes option price"""
+    sigma_sqrt_t = volatility * math.sqrt(time_to_expiry)
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    discounted_strike = strike_price * math.exp(-risk_free_rate * time_to_expiry)
+    if is_call:
+        return spot_price * _norm_cdf(d1) - discounted_strike * _norm_cdf(d2)
+    return discounted_strike * _norm_cdf(-d2) - spot_price * _norm_cdf(-d1)
+
+def _implied_vol(
+    price: float,
+    spot_price: float,
+    strike_price: float,
+    time_to_expiry: float,
+    risk_free_rate: float,
+    is_call: bool
+) -> Optional[float]:
+    """Invert Black-Scholes for volatility, or None if no volatility reproduces the price
+    
+    Uses Jaeckel's "Let's Be Rational" through py_vollib when it is installed,
+    otherwise Brent's method on [1e-6, 5].
+    """
+    if _vollib_iv is not None:
+        try:
+            return _vollib_iv(price, spot_price, strike_price, time_to_expiry, risk_free_rate, "c" if is_call else "p")
+        except Exception:
+            return None
+    
+    from scipy.optimize import brentq
+    
+    def price_error(volatility):
+        return _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call) - price
+    
+    try:
+        return brentq(price_error, 1e-6, 5.0, xtol=1e-8)
+    except ValueError:  # price is outside what any volatility in range can produce
+        return None
+
+@njit(cache=True)
+def _implied_vol_nb(price, spot_price, strike_price, time_to_expiry, risk_free_rate, is_call):
+    """Safeguarded Newton solve for Black-Scholes volatility; NaN if the price is out of range"""
+    low, high = 1e-6, 5.0
+    if not (_bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, low, is_call) < price
+            < _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, high, is_call)):
+        return math.nan
+    
+    sqrt_t = math.sqrt(time_to_expiry)
+    volatility = 0.25
+    for _ in range(100):
+        price_error = _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call) - price
+        if abs(price_error) < 1e-10:
+            break
+        # Price rises with volatility, so the sign of the error narrows the bracket
+        if price_error > 0:
+            high = volatility
+        else:
+            low = volatility
+        d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / (volatility * sqrt_t)
+        vega = spot_price * _norm_pdf(d1) * sqrt_t
+        step = volatility - price_error / vega if vega > 1e-12 else -1.0
+        # Fall back to bisection whenever Newton would leave the bracket
+        volatility = step if low < step < high else 0.5 * (low + high)
+    return volatility
+
+@njit(cache=True, parallel=True)
+def _implied_vol_batch_nb(prices, spot_price, strike_prices, times_to_expiry, risk_free_rate, is_call):
+    """Solve implied volatility for every contract in a chain"""
+    n = prices.shape[0]
+    out = np.empty(n)
+    for i in prange(n):
+        out[i] = _implied_vol_nb(prices[i], spot_price, strike_prices[i], times_to_expiry[i], risk_free_rate, is_call[i])
+    return out
+
+@functools.lru_cache(maxsize=16384)
+def _greeks_cached(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Greeks for already-quantized inputs; repeat requests skip the kernel"""
+    return _bs_greeks_nb(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call)
 
 class OptionsGreeks:
     """Advanced Options Greeks calculator using Black-Scholes model"""
@@ -36,32 +229,81 @@ class OptionsGreeks:
         option_type: str = "call"
     ) -> Dict[str, float]:
         
-        # Black-Scholes calculations
-        d1 = (np.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / (volatility * np.sqrt(time_to_expiry))
-        d2 = d1 - volatility * np.sqrt(time_to_expiry)
+        is_call = option_type.lower() == "call"
         
-        # Greeks calculations
-        if option_type.lower() == "call":
-            delta = norm.cdf(d1)
-            theta = (-spot_price * norm.pdf(d1) * volatility / (2 * np.sqrt(time_to_expiry)) 
-                    - risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2)) / 365
-        else:  # put
-            delta = norm.cdf(d1) - 1
-            theta = (-spot_price * norm.pdf(d1) * volatility / (2 * np.sqrt(time_to_expiry)) 
-                    + risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2)) / 365
+        # Expired or degenerate inputs: the kernel would divide by zero or take
+        # the log of a non-positive number, so return the intrinsic payoff's Greeks
+        if time_to_expiry <= 0 or volatility <= 0 or spot_price <= 0 or strike_price <= 0:
+            if is_call:
+                delta = 1.0 if spot_price > strike_price else 0.0
+            else:
+                delta = -1.0 if spot_price < strike_price else 0.0
+            return {"delta": delta, "gamma": 0.0, "theta": 0.0, "vega": 0.0, "rho": 0.0}
+        
+        # Quantize so inputs differing only by float noise share a cache entry
+        delta, gamma, theta, vega, rho = _greeks_cached(
+            round(spot_price, 2), strike_price, round(time_to_expiry, 5),
+            risk_free_rate, round(volatility, 4), is_call
+        )
         
-        gamma = norm.pdf(d1) / (spot_price * volatility * np.sqrt(time_to_expiry))
-        vega = spot_price * norm.pdf(d1) * np.sqrt(time_to_expiry) / 100
-        rho = (strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * 
-               (norm.cdf(d2) if option_type.lower() == "call" else norm.cdf(-d2))) / 100
+        return {"delta": delta, "gamma": gamma, "theta": theta, "vega": vega, "rho": rho}
+    
+    @staticmethod
+    def calculate_greeks_batch(
+        spot_price: float,
+        strike_prices: np.ndarray,
+        times_to_expiry: np.ndarray,  # in years
+        risk_free_rate: float,
+        volatilities: np.ndarray,
+        is_call: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Calculate Greeks for a whole chain at once, same formulas as calculate_greeks
+        
+        Results are float32, which is ample precision for the Greeks and halves
+        the size of the chain's Greek columns.
+        """
+        strikes = np.asarray(strike_prices, dtype=np.float64)
+        taus = np.asarray(times_to_expiry, dtype=np.float64)
+        sigmas = np.asarray(volatilities, dtype=np.float64)
+        is_call = np.asarray(is_call, dtype=bool)
+        
+        if NUMBA_AVAILABLE:
+            delta, gamma, theta, vega, rho = _bs_greeks_batch_nb(
+                float(spot_price), strikes, taus, float(risk_free_rate), sigmas, is_call
+            )
+            return {"delta": delta, "gamma": gamma, "theta": theta, "vega": vega, "rho": rho}
+        
+        # Black-Scholes calculations
+        sqrt_t = np.sqrt(taus)
+        sigma_sqrt_t = sigmas * sqrt_t
+        disc = np.exp(-risk_free_rate * taus)
+        d1 = (np.log(spot_price / strikes) + (risk_free_rate + 0.5 * sigmas**2) * taus) / sigma_sqrt_t
+        d2 = d1 - sigma_sqrt_t
+        cdf_d1 = ndtr(d1)
+        pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+        cdf_d2 = ndtr(np.where(is_call, d2, -d2))  # N(d2) for calls, N(-d2) for puts
         
-        return {
-            "delta": round(delta, 4),
-            "gamma": round(gamma, 4),
-            "theta": round(theta, 4),
-            "vega": round(vega, 4),
-            "rho": round(rho, 4)
+        # Greeks calculations
+        carry = risk_free_rate * strikes * disc * cdf_d2
+        rho = strikes * taus * disc * cdf_d2 / 100
+        greeks = {
+            "delta": np.where(is_call, cdf_d1, cdf_d1 - 1),
+            "gamma": pdf_d1 / (spot_price * sigma_sqrt_t),
+            "theta": (-spot_price * pdf_d1 * sigmas / (2 * sqrt_t) + np.where(is_call, -carry, carry)) / 365,
+            "vega": spot_price * pdf_d1 * sqrt_t / 100,
+            "rho": np.where(is_call, rho, -rho)
         }
+        return {name: values.astype(np.float32) for name, values in greeks.items()}
+
+@functools.lru_cache(maxsize=4096)
+def _parse_exp(expiration_date: str) -> datetime:
+    """Parse a YYYY-MM-DD expiration date; a chain shares only a few of them"""
+    return datetime.strptime(expiration_date, "%Y-%m-%d")
+
+def _option_ticker(symbol: str, strike_price: float, expiration_date: str, option_type: str) -> str:
+    """Polygon (OCC-style) option ticker, e.g. O:AAPL250117C00150000"""
+    right = "C" if option_type.lower() == "call" else "P"
+    return f"O:{symbol.upper()}{_parse_exp(expiration_date):%y%m%d}{right}{round(strike_price * 1000):08d}"
 
 class PolygonMCPClient:
     """Enhanced Polygon.io client with advanced options analytics"""
@@ -72,24 +314,55 @@ class PolygonMCPClient:
             raise ValueError("POLYGON_API_KEY environment variable is required")
         
         self.client = RESTClient(self.api_key)
-        self.http_client = httpx.AsyncClient()
+        self.http_client = httpx.AsyncClient(
+            base_url=POLYGON_BASE_URL,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=10.0,
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        self._price_cache: Dict[str, tuple] = {}
+        self._price_locks: Dict[str, asyncio.Lock] = {}
     
     async def get_stock_price(self, symbol: str) -> Dict[str, Any]:
         """Get current stock price and basic information"""
+        key = symbol.upper()
+        cached = self._price_cache.get(key)
+        if cached and time.monotonic() - cached[0] < _PRICE_TTL:
+            return cached[1]
+        
+        # Single-flight: concurrent misses for a symbol share one fetch
+        async with self._price_locks.setdefault(key, asyncio.Lock()):
+            cached = self._price_cache.get(key)
+            if cached and time.monotonic() - cached[0] < _PRICE_TTL:
+                return cached[1]
+            
+            result = await self._fetch_stock_price(symbol)
+            if "error" not in result:
+                self._price_cache[key] = (time.monotonic(), result)
+            return result
+    
+    async def _fetch_stock_price(self, symbol: str) -> Dict[str, Any]:
+        """Request the previous close and last trade from Polygon"""
         try:
-            # Get previous close data
-            prev_close = self.client.get_previous_close_agg(symbol)
+            # Get previous close data and last trade together
+            prev_response, trade_response = await asyncio.gather(
+                self.http_client.get(f"/v2/aggs/ticker/{symbol.upper()}/prev"),
+                self.http_client.get(f"/v2/last/trade/{symbol.upper()}")
+            )
+            prev_response.raise_for_status()
+            trade_response.raise_for_status()
             
-            # Get last trade
-            last_trade = self.client.get_last_trade(symbol)
+            prev_close = prev_response.json()["results"][0]
+            last_trade = trade_response.json().get("results")
             
             return {
                 "symbol": symbol.upper(),
-                "current_price": last_trade.price if last_trade else prev_close[0].close,
-                "previous_close": prev_close[0].close,
-                "volume": prev_close[0].volume,
-                "change": round((last_trade.price - prev_close[0].close) if last_trade else 0, 2),
-                "change_percent": round(((last_trade.price - prev_close[0].close) / prev_close[0].close * 100) if last_trade else 0, 2),
+                "current_price": last_trade["p"] if last_trade else prev_close["c"],
+                "previous_close": prev_close["c"],
+                "volume": prev_close["v"],
+                "change": round((last_trade["p"] - prev_close["c"]) if last_trade else 0, 2),
+                "change_percent": round(((last_trade["p"] - prev_close["c"]) / prev_close["c"] * 100) if last_trade else 0, 2),
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
@@ -98,50 +371,230 @@ class PolygonMCPClient:
     async def get_options_chain(self, symbol: str, expiration_date: Optional[str] = None) -> Dict[str, Any]:
         """Get comprehensive options chain data"""
         try:
-            # Get options contracts
-            contracts = list(self.client.list_options_contracts(
-                underlying_ticker=symbol,
-                expiration_date=expiration_date,
-                limit=100
-            ))
+            # Get options contracts; the SDK pages synchronously, so the listing
+            # runs off the event loop and stops after the first 100 contracts
+            contracts = await asyncio.to_thread(lambda: list(itertools.islice(
+                self.client.list_options_contracts(
+                    underlying_ticker=symbol,
+                    expiration_date=expiration_date,
+                    limit=100
+                ),
+                100
+            )))
             
             if not contracts:
                 return {"error": f"No options contracts found for {symbol}"}
             
-            # Get current stock price for context
-            stock_data = await self.get_stock_price(symbol)
+            # Get option snapshots concurrently; HTTP/2 multiplexes them over
+            # pooled connections, so a semaphore bounds how many are in flight
+            semaphore = asyncio.Semaphore(_SNAPSHOT_CONCURRENCY)
             
-            options_data = []
-            for contract in contracts:
+            async def fetch_snapshot(contract):
+                async with semaphore:
+                    return await self.http_client.get(f"/v3/snapshot/options/{symbol.upper()}/{contract.ticker}")
+            
+            # The stock price for context is fetched alongside them
+            stock_data, responses = await asyncio.gather(
+                self.get_stock_price(symbol),
+                asyncio.gather(
+                    *(fetch_snapshot(contract) for contract in contracts),
+                    return_exceptions=True
+                )
+            )
+            
+            # Collect the chain column-wise (one list per field) so the arrays
+            # can go straight into the batch Greeks kernel
+            tickers, strikes, expirations, option_types = [], [], [], []
+            bids, asks, volumes, open_interests, implied_vols = [], [], [], [], []
+            for contract, response in zip(contracts, responses):
                 try:
-                    # Get option snapshot
-                    snapshot = self.client.get_snapshot_option(contract.ticker)
-                    
-                    option_info = {
-                        "contract_ticker": contract.ticker,
-                        "strike_price": contract.strike_price,
-                        "expiration_date": contract.expiration_date,
-                        "option_type": contract.contract_type,
-                        "last_price": snapshot.last_quote.bid if snapshot.last_quote else None,
-                        "bid": snapshot.last_quote.bid if snapshot.last_quote else None,
-                        "ask": snapshot.last_quote.ask if snapshot.last_quote else None,
-                        "volume": snapshot.day.volume if snapshot.day else 0,
-                        "open_interest": snapshot.open_interest if hasattr(snapshot, 'open_interest') else None
-                    }
-                    options_data.append(option_info)
-                except Exception as e:
+                    response.raise_for_status()
+                    snapshot = response.json()["results"]
+                    last_quote = snapshot.get("last_quote") or {}
+                    day = snapshot.get("day") or {}
+                except Exception:
+                    # Failed requests come back from gather as exceptions, and
+                    # empty ("results": null) snapshots fail here
                     continue
+                
+                tickers.append(contract.ticker)
+                strikes.append(contract.strike_price)
+                expirations.append(contract.expiration_date)
+                option_types.append(contract.contract_type)
+                bids.append(last_quote.get("bid"))
+                asks.append(last_quote.get("ask"))
+                volumes.append(day.get("volume", 0))
+                open_interests.append(snapshot.get("open_interest"))
+                implied_vols.append(snapshot.get("implied_volatility"))
+            
+            # Price every unexpired contract in one vectorized pass, using the
+            # snapshot IV where Polygon provides one
+            count = len(tickers)
+            greek_columns = {name: np.full(count, np.nan, dtype=np.float32) for name in ("delta", "gamma", "theta", "vega", "rho")}
+            spot_price = stock_data.get("current_price")
+            if spot_price and count:
+                now = datetime.now()
+                taus = np.array([
+                    (_parse_exp(expiration) - now).days / 365.0
+                    for expiration in expirations
+                ])
+                sigmas = np.array([vol or 0.25 for vol in implied_vols], dtype=np.float64)
+                strike_array = np.asarray(strikes, dtype=np.float64)
+                is_call = np.array(option_types) == "call"
+                priceable = (taus > 0) & (sigmas > 0) & (strike_array > 0)
+                live = np.flatnonzero(priceable)
+                greeks = OptionsGreeks.calculate_greeks_batch(
+                    spot_price,
+                    strike_array[live],
+                    taus[live],
+                    0.05,
+                    sigmas[live],
+                    is_call[live]
+                )
+                for name, values in greeks.items():
+                    greek_columns[name][live] = values
+                
+                # Expired or degenerate contracts get the intrinsic payoff's
+                # Greeks, as OptionsGreeks.calculate_greeks returns for them
+                dead = np.flatnonzero(~priceable)
+                in_the_money = np.where(is_call[dead], spot_price > strike_array[dead], spot_price < strike_array[dead])
+                greek_columns["delta"][dead] = np.where(is_call[dead], 1.0, -1.0) * in_the_money
+                for name in ("gamma", "theta", "vega", "rho"):
+                    greek_columns[name][dead] = 0.0
+            
+            # The columns become one DataFrame; contracts without Greeks keep
+            # NaN there, which write_json emits as null
+            chain = pl.DataFrame({
+                "contract_ticker": tickers,
+                "strike_price": strikes,
+                "expiration_date": expirations,
+                "option_type": option_types,
+                "last_price": bids,
+                "bid": bids,
+                "ask": asks,
+                "volume": volumes,
+                "open_interest": open_interests,
+                "implied_volatility": implied_vols,
+                **greek_columns
+            }, strict=False)
             
             return {
                 "symbol": symbol.upper(),
                 "stock_price": stock_data.get("current_price"),
-                "options_count": len(options_data),
-                "options": options_data[:50],  # Limit to first 50 for readability
+                "options_count": count,
+                # Limit to first 50 for readability; the rows are already JSON
+                "options": orjson.Fragment(chain.head(50).write_json()),
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
             return {"error": f"Failed to get options chain: {str(e)}"}
     
+    async def get_chain_with_greeks(self, symbol: str, expiration_date: Optional[str] = None) -> Dict[str, Any]:
+        """Options chain with implied volatility and Greeks for every contract
+        
+        One spot quote and one chain snapshot request, then a single batch IV
+        solve and a single batch Greeks pass over the whole chain.
+        """
+        try:
+            params = {"limit": _CHAIN_SNAPSHOT_LIMIT}
+            if expiration_date:
+                params["expiration_date"] = expiration_date
+            
+            stock_data, response = await asyncio.gather(
+                self.get_stock_price(symbol),
+                self.http_client.get(f"/v3/snapshot/options/{symbol.upper()}", params=params)
+            )
+            if "error" in stock_data:
+                return stock_data
+            response.raise_for_status()
+            
+            snapshots = response.json().get("results") or []
+            if not snapshots:
+                return {"error": f"No options contracts found for {symbol}"}
+            
+            # Contract metadata and quotes come back together in the chain snapshot
+            tickers, strikes, expirations, option_types, bids, asks = [], [], [], [], [], []
+            for snapshot in snapshots:
+                details = snapshot.get("details") or {}
+                last_quote = snapshot.get("last_quote") or {}
+                tickers.append(details.get("ticker"))
+                strikes.append(details.get("strike_price"))
+                expirations.append(details.get("expiration_date"))
+                option_types.append(details.get("contract_type"))
+                bids.append(last_quote.get("bid") or 0.0)
+                asks.append(last_quote.get("ask") or 0.0)
+            
+            spot_price = float(stock_data["current_price"])
+            now = datetime.now()
+            strike_array = np.asarray(strikes, dtype=np.float64)
+            taus = np.array([(_parse_exp(expiration) - now).days / 365.0 for expiration in expirations])
+            bid_array = np.asarray(bids, dtype=np.float64)
+            ask_array = np.asarray(asks, dtype=np.float64)
+            mids = np.where((bid_array > 0) & (ask_array > 0), 0.5 * (bid_array + ask_array), np.nan)
+            is_call = np.array(option_types) == "call"
+            
+            # Solve IV for every unexpired contract with a two-sided quote
+            implied_vols = np.full(len(tickers), np.nan)
+            quoted = np.flatnonzero((taus > 0) & np.isfinite(mids))
+            implied_vols[quoted] = _implied_vol_batch_nb(
+                mids[quoted], spot_price, strike_array[quoted], taus[quoted], 0.05, is_call[quoted]
+            )
+            
+            # Then price the contracts whose IV could be solved
+            priced = np.flatnonzero(np.isfinite(implied_vols))
+            greeks = OptionsGreeks.calculate_greeks_batch(
+                spot_price, strike_array[priced], taus[priced], 0.05, implied_vols[priced], is_call[priced]
+            )
+            greek_columns = {}
+            for name, values in greeks.items():
+                column = np.full(len(tickers), np.nan, dtype=np.float32)
+                column[priced] = values
+                greek_columns[name] = column
+            
+            # Same row layout as get_options_chain; unsolved IVs and Greeks
+            # stay NaN in the DataFrame and are written as null
+            chain = pl.DataFrame({
+                "contract_ticker": tickers,
+                "strike_price": strikes,
+                "expiration_date": expirations,
+                "option_type": option_types,
+                "bid": bid_array,
+                "ask": ask_array,
+                "mid_price": mids,
+                "implied_volatility": implied_vols,
+                **greek_columns
+            }, strict=False)
+            
+            return {
+                "symbol": symbol.upper(),
+                "stock_price": spot_price,
+                "expiration_date": expiration_date,
+                "options_count": len(tickers),
+                "options": orjson.Fragment(chain.write_json()),
+                "timestamp": now.isoformat()
+            }
+        except Exception as e:
+            return {"error": f"Failed to get options chain with Greeks: {str(e)}"}
+    
+    async def get_option_mid_price(
+        self,
+        symbol: str,
+        strike_price: float,
+        expiration_date: str,
+        option_type: str
+    ) -> Optional[float]:
+        """Bid/ask midpoint for one contract, or None when there is no two-sided quote"""
+        try:
+            ticker = _option_ticker(symbol, strike_price, expiration_date, option_type)
+            response = await self.http_client.get(f"/v3/snapshot/options/{symbol.upper()}/{ticker}")
+            response.raise_for_status()
+            last_quote = response.json()["results"].get("last_quote") or {}
+        except Exception:  # failed request, or no snapshot for the contract
+            return None
+        
+        bid, ask = last_quote.get("bid"), last_quote.get("ask")
+        return (bid + ask) / 2 if bid and ask else None
+    
     async def calculate_option_greeks(
         self, 
         symbol: str, 
@@ -160,14 +613,27 @@ class PolygonMCPClient:
             spot_price = stock_data["current_price"]
             
             # Calculate time to expiry
-            exp_date = datetime.strptime(expiration_date, "%Y-%m-%d")
+            exp_date = _parse_exp(expiration_date)
             time_to_expiry = (exp_date - datetime.now()).days / 365.0
             
             if time_to_expiry <= 0:
                 return {"error": "Option has already expired"}
             
-            # Use provided volatility or default
-            vol = volatility or 0.25
+            # Use provided volatility, else the one implied by the contract's
+            # quoted mid price, else the default
+            vol = volatility
+            volatility_source = "provided"
+            if not vol:
+                mid_price = await self.get_option_mid_price(symbol, strike_price, expiration_date, option_type)
+                if mid_price:
+                    vol = _implied_vol(
+                        mid_price, spot_price, strike_price, time_to_expiry, 0.05,
+                        option_type.lower() == "call"
+                    )
+                    volatility_source = "implied"
+            if not vol:
+                vol = 0.25
+                volatility_source = "default"
             
             # Calculate Greeks
             greeks = OptionsGreeks.calculate_greeks(
@@ -186,6 +652,7 @@ class PolygonMCPClient:
                 "time_to_expiry_days": round(time_to_expiry * 365),
                 "option_type": option_type,
                 "volatility": vol,
+                "volatility_source": volatility_source,
                 "greeks": greeks,
                 "timestamp": datetime.now().isoformat()
             }
@@ -209,22 +676,35 @@ class PolygonMCPClient:
             }
         except Exception as e:
             return {"error": f"Failed to get market status: {str(e)}"}
+    
+    async def close(self):
+        """Close HTTP client"""
+        await self.http_client.aclose()
 
-# Initialize the client
-polygon_client = PolygonMCPClient()
+def _to_json(result: Dict[str, Any]) -> str:
+    """Serialize a tool result as JSON (NumPy scalars and arrays included)"""
+    # FastMCP passes str results through as text content but would JSON-encode
+    # bytes a second time, so decode here rather than returning bytes
+    return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC).decode()
 
 # MCP Tools
 @mcp.tool()
 async def get_stock_price(symbol: str) -> str:
     """Get current stock price and basic information for a given symbol"""
     result = await polygon_client.get_stock_price(symbol)
-    return str(result)
+    return _to_json(result)
 
 @mcp.tool()
 async def get_options_chain(symbol: str, expiration_date: Optional[str] = None) -> str:
     """Get options chain data for a stock symbol. Optionally filter by expiration date (YYYY-MM-DD)"""
     result = await polygon_client.get_options_chain(symbol, expiration_date)
-    return str(result)
+    return _to_json(result)
+
+@mcp.tool()
+async def get_options_chain_with_greeks(symbol: str, expiration_date: Optional[str] = None) -> str:
+    """Get an options chain with implied volatility and Greeks for every contract. Optionally filter by expiration date (YYYY-MM-DD)"""
+    result = await polygon_client.get_chain_with_greeks(symbol, expiration_date)
+    return _to_json(result)
 
 @mcp.tool()
 async def calculate_option_greeks(
@@ -236,13 +716,13 @@ async def calculate_option_greeks(
 ) -> str:
     """Calculate Options Greeks (Delta, Gamma, Theta, Vega, Rho) for an option using Black-Scholes model"""
     result = await polygon_client.calculate_option_greeks(symbol, strike_price, expiration_date, option_type, volatility)
-    return str(result)
+    return _to_json(result)
 
 @mcp.tool()
 async def get_market_status() -> str:
     """Get current market status and trading hours"""
     result = await polygon_client.get_market_status()
-    return str(result)
+    return _to_json(result)
 
 # MCP Resources
 @mcp.resource("market://status")
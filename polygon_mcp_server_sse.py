@@ -8,24 +8,127 @@ with Server-Sent Events (SSE) transport for Claude Desktop GUI integration.
 import os
 import asyncio
 import math
+import functools
+import itertools
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
 
 import httpx
-import numpy as np
-from scipy.stats import norm
+import urllib3
 from dotenv import load_dotenv
 from polygon import RESTClient
+from polygon.exceptions import BadResponse
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional - fall back to the plain Python kernel
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+try:
+    from py_vollib.black_scholes.implied_volatility import implied_volatility as _vollib_iv
+except ImportError:  # py_vollib is optional - fall back to a bracketed root search
+    _vollib_iv = None
+
 # Load environment variables
 load_dotenv()
 
 # Initialize FastMCP server with SSE transport
 mcp = FastMCP("Polygon.io Advanced Options MCP Server")
 
+# Rows returned by get_options_chain; pagination stops once CONTRACTS_LIMIT
+# is reached and market data is listed for the first SNAPSHOTS_LIMIT of them
+CONTRACTS_LIMIT = 50
+SNAPSHOTS_LIMIT = 20
+
+_INV_SQRT2 = 1 / math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+@njit(cache=True, fastmath=True)
+def _norm_cdf(x: float) -> float:
+    """Standard normal CDF for a scalar"""
+    return 0.5 * math.erfc(-x * _INV_SQRT2)
+
+@njit(cache=True, fastmath=True)
+def _norm_pdf(x: float) -> float:
+    """Standard normal PDF for a scalar"""
+    return math.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+@njit(cache=True, fastmath=True)
+def _bs_greeks_nb(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes kernel returning (delta, gamma, theta, vega, rho)"""
+    sqrt_t = math.sqrt(time_to_expiry)
+    sigma_sqrt_t = volatility * sqrt_t
+    disc = math.exp(-risk_free_rate * time_to_expiry)
+    
+    # Black-Scholes calculations
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    pdf_d1 = _norm_pdf(d1)
+    
+    # Greeks calculations (cdf_d2 is N(d2) for calls, N(-d2) for puts)
+    if is_call:
+        delta = _norm_cdf(d1)
+        cdf_d2 = _norm_cdf(d2)
+        rho = strike_price * time_to_expiry * disc * cdf_d2 / 100
+    else:  # put
+        delta = -_norm_cdf(-d1)
+        cdf_d2 = _norm_cdf(-d2)
+        rho = -strike_price * time_to_expiry * disc * cdf_d2 / 100
+    
+    gamma = pdf_d1 / (spot_price * sigma_sqrt_t)
+    theta = (-(spot_price * pdf_d1 * volatility) / (2 * sqrt_t) - 
+            risk_free_rate * strike_price * disc * cdf_d2) / 365
+    vega = spot_price * pdf_d1 * sqrt_t / 100
+    
+    return delta, gamma, theta, vega, rho
+
+# Compile the kernel at import so the first tool call doesn't pay for it
+_bs_greeks_nb(100.0, 100.0, 1.0, 0.05, 0.25, True)
+
+@njit(cache=True, fastmath=True)
+def _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call):
+    """Black-Scholes option price"""
+    sigma_sqrt_t = volatility * math.sqrt(time_to_expiry)
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    discounted_strike = strike_price * math.exp(-risk_free_rate * time_to_expiry)
+    if is_call:
+        return spot_price * _norm_cdf(d1) - discounted_strike * _norm_cdf(d2)
+    return discounted_strike * _norm_cdf(-d2) - spot_price * _norm_cdf(-d1)
+
+def _implied_vol(
+    price: float,
+    spot_price: float,
+    strike_price: float,
+    time_to_expiry: float,
+    risk_free_rate: float,
+    is_call: bool
+) -> Optional[float]:
+    """Invert Black-Scholes for volatility, or None if no volatility reproduces the price
+    
+    Uses Jaeckel's "Let's Be Rational" through py_vollib when it is installed,
+    otherwise Brent's method on [1e-6, 5].
+    """
+    if _vollib_iv is not None:
+        try:
+            return _vollib_iv(price, spot_price, strike_price, time_to_expiry, risk_free_rate, "c" if is_call else "p")
+        except Exception:
+            return None
+    
+    from scipy.optimize import brentq
+    
+    def price_error(volatility):
+        return _bs_price(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call) - price
+    
+    try:
+        return brentq(price_error, 1e-6, 5.0, xtol=1e-8)
+    except ValueError:  # price is outside what any volatility in range can produce
+        return None
+
 class OptionsGreeks:
     """Advanced Options Greeks calculator using Black-Scholes model"""
     
@@ -39,10 +142,11 @@ class OptionsGreeks:
         option_type: str = "call"
     ) -> Dict[str, float]:
         """Calculate all Greeks using Black-Scholes model"""
+        is_call = option_type.lower() == "call"
         
         if time_to_expiry <= 0:
             return {
-                "delta": 1.0 if option_type.lower() == "call" and spot_price > strike_price else 0.0,
+                "delta": 1.0 if is_call and spot_price > strike_price else 0.0,
                 "gamma": 0.0,
                 "theta": 0.0,
                 "vega": 0.0,
@@ -50,23 +154,9 @@ class OptionsGreeks:
                 "implied_volatility": volatility
             }
         
-        # Black-Scholes calculations
-        d1 = (np.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / (volatility * np.sqrt(time_to_expiry))
-        d2 = d1 - volatility * np.sqrt(time_to_expiry)
-        
-        # Greeks calculations
-        if option_type.lower() == "call":
-            delta = norm.cdf(d1)
-            rho = strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2) / 100
-        else:  # put
-            delta = -norm.cdf(-d1)
-            rho = -strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) / 100
-        
-        gamma = norm.pdf(d1) / (spot_price * volatility * np.sqrt(time_to_expiry))
-        theta = (-(spot_price * norm.pdf(d1) * volatility) / (2 * np.sqrt(time_to_expiry)) - 
-                risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * 
-                (norm.cdf(d2) if option_type.lower() == "call" else norm.cdf(-d2))) / 365
-        vega = spot_price * norm.pdf(d1) * np.sqrt(time_to_expiry) / 100
+        delta, gamma, theta, vega, rho = _bs_greeks_nb(
+            spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, is_call
+        )
         
         return {
             "delta": round(delta, 4),
@@ -77,6 +167,16 @@ class OptionsGreeks:
             "implied_volatility": volatility
         }
 
+@functools.lru_cache(maxsize=4096)
+def _parse_exp(expiration_date: str) -> datetime:
+    """Parse a YYYY-MM-DD expiration date; a chain shares only a few of them"""
+    return datetime.strptime(expiration_date, "%Y-%m-%d")
+
+def _option_ticker(symbol: str, strike_price: float, expiration_date: str, option_type: str) -> str:
+    """Polygon (OCC-style) option ticker, e.g. O:AAPL250117C00150000"""
+    right = "C" if option_type.lower() == "call" else "P"
+    return f"O:{symbol.upper()}{_parse_exp(expiration_date):%y%m%d}{right}{round(strike_price * 1000):08d}"
+
 class PolygonMCPClient:
     """Enhanced Polygon.io client with MCP integration"""
     
@@ -109,45 +209,53 @@ class PolygonMCPClient:
     async def get_options_chain(self, symbol: str, expiration_date: Optional[str] = None) -> Dict[str, Any]:
         """Get comprehensive options chain with enhanced data"""
         try:
-            params = {"underlying_ticker": symbol.upper()}
+            params = {"limit": CONTRACTS_LIMIT}
             if expiration_date:
                 params["expiration_date"] = expiration_date
             
-            # Get options contracts
-            contracts = list(self.client.list_options_contracts(**params))
-            
-            # Get options snapshots for real-time data
+            # The chain snapshot carries each contract's details alongside its
+            # market data, so one request covers both
             try:
-                snapshots = list(self.client.list_snapshot_options_chain(symbol.upper()))
-            except:
+                snapshots = list(itertools.islice(
+                    self.client.list_snapshot_options_chain(symbol.upper(), params=params),
+                    CONTRACTS_LIMIT
+                ))
+                details = [snap.details for snap in snapshots if snap.details]
+            except (BadResponse, urllib3.exceptions.HTTPError):
+                # Without snapshot access (e.g. an unentitled plan) the contract
+                # list still comes back, just without market data
                 snapshots = []
+                details = list(itertools.islice(
+                    self.client.list_options_contracts(underlying_ticker=symbol.upper(), **params),
+                    CONTRACTS_LIMIT
+                ))
             
             return {
                 "symbol": symbol.upper(),
                 "expiration_date": expiration_date,
-                "contracts_count": len(contracts),
+                "contracts_count": len(details),
                 "contracts": [
                     {
-                        "ticker": contract.ticker,
-                        "strike_price": contract.strike_price,
-                        "expiration_date": contract.expiration_date,
-                        "contract_type": contract.contract_type,
-                        "exercise_style": getattr(contract, 'exercise_style', 'american'),
-                        "shares_per_contract": getattr(contract, 'shares_per_contract', 100)
-                    } for contract in contracts[:50]  # Limit to first 50 for performance
+                        "ticker": detail.ticker,
+                        "strike_price": detail.strike_price,
+                        "expiration_date": detail.expiration_date,
+                        "contract_type": detail.contract_type,
+                        "exercise_style": detail.exercise_style or 'american',
+                        "shares_per_contract": detail.shares_per_contract or 100
+                    } for detail in details
                 ],
                 "snapshots": [
                     {
-                        "ticker": snap.ticker if hasattr(snap, 'ticker') else None,
+                        "ticker": snap.details.ticker if snap.details else None,
                         "last_quote": {
-                            "bid": snap.last_quote.bid if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "ask": snap.last_quote.ask if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "bid_size": snap.last_quote.bid_size if hasattr(snap, 'last_quote') and snap.last_quote else None,
-                            "ask_size": snap.last_quote.ask_size if hasattr(snap, 'last_quote') and snap.last_quote else None,
+                            "bid": snap.last_quote.bid if snap.last_quote else None,
+                            "ask": snap.last_quote.ask if snap.last_quote else None,
+                            "bid_size": snap.last_quote.bid_size if snap.last_quote else None,
+                            "ask_size": snap.last_quote.ask_size if snap.last_quote else None,
                         },
-                        "open_interest": getattr(snap, 'open_interest', None),
-                        "volume": getattr(snap, 'volume', None)
-                    } for snap in snapshots[:20]  # Limit snapshots
+                        "open_interest": snap.open_interest,
+                        "volume": snap.day.volume if snap.day else None
+                    } for snap in snapshots[:SNAPSHOTS_LIMIT]
                 ],
                 "timestamp": datetime.now().isoformat(),
                 "status": "success"
@@ -155,6 +263,27 @@ class PolygonMCPClient:
         except Exception as e:
             return {"error": str(e), "symbol": symbol, "status": "error"}
     
+    async def get_option_mid_price(
+        self,
+        symbol: str,
+        strike_price: float,
+        expiration_date: str,
+        option_type: str
+    ) -> Optional[float]:
+        """Bid/ask midpoint for one contract, or None when there is no two-sided quote"""
+        ticker = _option_ticker(symbol, strike_price, expiration_date, option_type)
+        try:
+            # The SDK call is synchronous, so it runs in a worker thread
+            snapshot = await asyncio.to_thread(self.client.get_snapshot_option, symbol.upper(), ticker)
+        except (BadResponse, urllib3.exceptions.HTTPError):  # unknown contract or request failure
+            return None
+        
+        last_quote = snapshot.last_quote
+        
+        if not last_quote or not last_quote.bid or not last_quote.ask:
+            return None
+        return (last_quote.bid + last_quote.ask) / 2
+    
     async def calculate_option_greeks(
         self, 
         symbol: str, 
@@ -164,6 +293,7 @@ class PolygonMCPClient:
         volatility: Optional[float] = None
     ) -> Dict[str, Any]:
         """Calculate Greeks for a specific option with real market data"""
+        option_type = option_type.lower()
         try:
             # Get current stock price
             stock_data = await self.get_stock_price(symbol)
@@ -175,13 +305,20 @@ class PolygonMCPClient:
                 return {"error": "Could not get current stock price", "status": "error"}
             
             # Calculate time to expiry
-            exp_date = datetime.strptime(expiration_date, "%Y-%m-%d")
+            exp_date = _parse_exp(expiration_date)
             time_to_expiry = (exp_date - datetime.now()).days / 365.0
             
             if time_to_expiry < 0:
                 return {"error": "Option has already expired", "status": "error"}
             
-            # Use provided volatility or default
+            # Use provided volatility, else the one implied by the contract's
+            # quoted mid price, else the default
+            if volatility is None and time_to_expiry > 0:
+                mid_price = await self.get_option_mid_price(symbol, strike_price, expiration_date, option_type)
+                if mid_price:
+                    volatility = _implied_vol(
+                        mid_price, spot_price, strike_price, time_to_expiry, 0.05, option_type == "call"
+                    )
             if volatility is None:
                 volatility = 0.25  # Default 25% IV
             
@@ -191,14 +328,14 @@ class PolygonMCPClient:
                 strike_price=strike_price,
                 time_to_expiry=time_to_expiry,
                 volatility=volatility,
-                option_type=option_type.lower()
+                option_type=option_type
             )
             
             return {
                 "symbol": symbol.upper(),
                 "strike_price": strike_price,
                 "expiration_date": expiration_date,
-                "option_type": option_type.lower(),
+                "option_type": option_type,
                 "spot_price": spot_price,
                 "time_to_expiry_years": round(time_to_expiry, 4),
                 "time_to_expiry_days": round(time_to_expiry * 365, 0),
@@ -238,6 +375,51 @@ async def lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
 # Set lifespan for the server
 mcp.lifespan = lifespan
 
+# Response templates, filled with format_map once values are normalized
+_STOCK_PRICE_TMPL = """Stock Price for {symbol}:
+Price: ${price}
+Last Trade: ${last_trade_price}
+Volume: {volume}
+Updated: {timestamp}"""
+
+_OPTIONS_CHAIN_TMPL = """Options Chain for {symbol}:
+Contracts Found: {contracts_count}
+Expiration Filter: {expiration_date}
+
+Recent Contracts:"""
+
+_CONTRACT_LINE_TMPL = """
+  {ticker} - ${strike_price} {contract_type}
+  Expires: {expiration_date}"""
+
+_GREEKS_TMPL = """Options Greeks for {symbol} ${strike_price} {option_type}:
+
+Current Stock Price: ${spot_price:.2f}
+Time to Expiry: {time_to_expiry_days} days ({time_to_expiry_years:.4f} years)
+Expiration: {expiration_date}
+
+Greeks:
+  Delta: {delta:.4f} (price sensitivity)
+  Gamma: {gamma:.4f} (delta sensitivity)  
+  Theta: {theta:.4f} (time decay per day)
+  Vega: {vega:.4f} (volatility sensitivity)
+  Rho: {rho:.4f} (interest rate sensitivity)
+  
+Implied Volatility: {implied_volatility:.1%}
+Calculated: {timestamp}"""
+
+_MARKET_STATUS_TMPL = """Market Status:
+Market: {status.market}
+Server Time: {status.serverTime}
+Exchanges:
+  NYSE: {status.exchanges.nyse}
+  NASDAQ: {status.exchanges.nasdaq}
+  OTC: {status.exchanges.otc}"""
+
+def _fmt(value: Any, spec: str = "") -> str:
+    """Format a possibly-missing value, showing N/A instead of failing on None"""
+    return "N/A" if value is None else format(value, spec)
+
 # MCP Tools
 @mcp.tool()
 async def get_stock_price(symbol: str) -> str:
@@ -253,11 +435,12 @@ async def get_stock_price(symbol: str) -> str:
     result = await polygon_client.get_stock_price(symbol)
     
     if result["status"] == "success":
-        return f"""Stock Price for {result['symbol']}:
-Price: ${result['price']:.2f}
-Last Trade: ${result.get('last_trade_price', 'N/A')}
-Volume: {result.get('volume', 'N/A'):,}
-Updated: {result['timestamp']}"""
+        return _STOCK_PRICE_TMPL.format_map({
+            **result,
+            "price": _fmt(result["price"], ".2f"),
+            "last_trade_price": _fmt(result["last_trade_price"]),
+            "volume": _fmt(result["volume"], ",")
+        })
     else:
         return f"Error getting stock price for {symbol}: {result.get('error', 'Unknown error')}"
 
@@ -276,16 +459,14 @@ async def get_options_chain(symbol: str, expiration_date: Optional[str] = None)
     result = await polygon_client.get_options_chain(symbol, expiration_date)
     
     if result["status"] == "success":
-        response = f"""Options Chain for {result['symbol']}:
-Contracts Found: {result['contracts_count']}
-Expiration Filter: {result.get('expiration_date', 'All dates')}
-
-Recent Contracts:"""
-        
-        for contract in result['contracts'][:10]:  # Show first 10
-            response += f"""
-  {contract['ticker']} - ${contract['strike_price']} {contract['contract_type'].upper()}
-  Expires: {contract['expiration_date']}"""
+        response = _OPTIONS_CHAIN_TMPL.format_map(result) + "".join(
+            _CONTRACT_LINE_TMPL.format(
+                ticker=contract['ticker'],
+                strike_price=contract['strike_price'],
+                contract_type=contract['contract_type'].upper(),
+                expiration_date=contract['expiration_date']
+            ) for contract in result['contracts'][:10]  # Show first 10
+        )
         
         if result['snapshots']:
             response += f"\n\nReal-time Data Available: {len(result['snapshots'])} contracts"
@@ -320,22 +501,9 @@ async def calculate_option_greeks(
     )
     
     if result["status"] == "success":
-        greeks = result["greeks"]
-        return f"""Options Greeks for {result['symbol']} ${result['strike_price']} {result['option_type'].upper()}:
-
-Current Stock Price: ${result['spot_price']:.2f}
-Time to Expiry: {result['time_to_expiry_days']} days ({result['time_to_expiry_years']:.4f} years)
-Expiration: {result['expiration_date']}
-
-Greeks:
-  Delta: {greeks['delta']:.4f} (price sensitivity)
-  Gamma: {greeks['gamma']:.4f} (delta sensitivity)  
-  Theta: {greeks['theta']:.4f} (time decay per day)
-  Vega: {greeks['vega']:.4f} (volatility sensitivity)
-  Rho: {greeks['rho']:.4f} (interest rate sensitivity)
-  
-Implied Volatility: {greeks['implied_volatility']:.1%}
-Calculated: {result['timestamp']}"""
+        return _GREEKS_TMPL.format_map(
+            {**result, **result["greeks"], "option_type": result["option_type"].upper()}
+        )
     else:
         return f"Error calculating Greeks: {result.get('error', 'Unknown error')}"
 
@@ -348,13 +516,7 @@ async def get_market_status() -> str:
     
     try:
         status = polygon_client.client.get_market_status()
-        return f"""Market Status:
-Market: {status.market}
-Server Time: {status.serverTime}
-Exchanges:
-  NYSE: {status.exchanges.nyse}
-  NASDAQ: {status.exchanges.nasdaq}
-  OTC: {status.exchanges.otc}"""
+        return _MARKET_STATUS_TMPL.format_map({"status": status})
     except Exception as e:
         return f"Error getting market status: {str(e)}"
 
@@ -8,14 +8,16 @@ with advanced options analytics, Greeks calculation, and real-time market data.
 import asyncio
 import os
 import math
+import time
+import functools
+import itertools
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 
 import httpx
 import numpy as np
-from scipy.stats import norm
+import orjson
 from dotenv import load_dotenv
-from polygon import RESTClient
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -28,9 +30,59 @@ from mcp.types import (
     LoggingLevel
 )
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional - fall back to the plain Python kernel
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 # Load environment variables
 load_dotenv()
 
+POLYGON_BASE_URL = "https://api.polygon.io"
+_SNAPSHOT_CONCURRENCY = 20  # option snapshot requests in flight per chain
+CONTRACTS_LIMIT = 100  # contracts listed per chain; the SDK would keep following next_url
+PREV_CLOSE_CACHE_TTL = 3600.0  # previous close is fixed for the whole session
+MARKET_STATUS_CACHE_TTL = 30.0
+RESPONSE_CACHE_SIZE = 256  # cached responses kept before the oldest is evicted
+
+_INV_SQRT2 = 1 / math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+@njit(cache=True, fastmath=True)
+def _norm_cdf(x: float) -> float:
+    """Standard normal CDF"""
+    return 0.5 * math.erfc(-x * _INV_SQRT2)
+
+@njit(cache=True, fastmath=True)
+def _norm_pdf(x: float) -> float:
+    """Standard normal density"""
+    return _INV_SQRT_2PI * math.exp(-0.5 * x * x)
+
+@njit(cache=True, fastmath=True)
+def _greeks_kernel(spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, phi):
+    """Black-Scholes kernel returning (delta, gamma, theta, vega, rho); phi is +1 for calls, -1 for puts"""
+    sqrt_t = math.sqrt(time_to_expiry)
+    sigma_sqrt_t = volatility * sqrt_t
+    exp_rt = math.exp(-risk_free_rate * time_to_expiry)
+    d1 = (math.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility * volatility) * time_to_expiry) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    pdf_d1 = _norm_pdf(d1)
+    N_phi_d2 = _norm_cdf(phi * d2)  # N(d2) for calls, N(-d2) for puts
+    discounted_strike = strike_price * exp_rt
+    
+    # Greeks calculations, one straight-line path for calls and puts
+    delta = phi * _norm_cdf(phi * d1)
+    gamma = pdf_d1 / (spot_price * sigma_sqrt_t)
+    theta = (-spot_price * pdf_d1 * volatility / (2 * sqrt_t) - phi * risk_free_rate * discounted_strike * N_phi_d2) / 365
+    vega = spot_price * pdf_d1 * sqrt_t / 100
+    rho = phi * time_to_expiry * discounted_strike * N_phi_d2 / 100
+    
+    return delta, gamma, theta, vega, rho
+
+# Compile the kernel at import so the first tool call doesn't pay for it
+_greeks_kernel(100.0, 100.0, 1.0, 0.05, 0.25, 1.0)
+
 class OptionsGreeks:
     """Advanced Options Greeks calculator using Black-Scholes model"""
     
@@ -44,31 +96,48 @@ class OptionsGreeks:
         option_type: str = "call"
     ) -> Dict[str, float]:
         
-        # Black-Scholes calculations
-        d1 = (np.log(spot_price / strike_price) + (risk_free_rate + 0.5 * volatility**2) * time_to_expiry) / (volatility * np.sqrt(time_to_expiry))
-        d2 = d1 - volatility * np.sqrt(time_to_expiry)
+        # "call"/"put" differ in their first letter, so no lowercased copy is needed
+        phi = 1.0 if option_type[:1] in ("c", "C") else -1.0
         
-        # Greeks calculations
-        if option_type.lower() == "call":
-            delta = norm.cdf(d1)
-            theta = (-spot_price * norm.pdf(d1) * volatility / (2 * np.sqrt(time_to_expiry)) 
-                    - risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2)) / 365
-        else:  # put
-            delta = norm.cdf(d1) - 1
-            theta = (-spot_price * norm.pdf(d1) * volatility / (2 * np.sqrt(time_to_expiry)) 
-                    + risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2)) / 365
+        delta, gamma, theta, vega, rho = _greeks_kernel(
+            spot_price, strike_price, time_to_expiry, risk_free_rate, volatility, phi
+        )
         
-        gamma = norm.pdf(d1) / (spot_price * volatility * np.sqrt(time_to_expiry))
-        vega = spot_price * norm.pdf(d1) * np.sqrt(time_to_expiry) / 100
-        rho = (strike_price * time_to_expiry * np.exp(-risk_free_rate * time_to_expiry) * 
-               (norm.cdf(d2) if option_type.lower() == "call" else norm.cdf(-d2))) / 100
+        return {"delta": delta, "gamma": gamma, "theta": theta, "vega": vega, "rho": rho}
+    
+    @staticmethod
+    def calculate_greeks_vec(
+        spot_price: float,
+        strike_prices: np.ndarray,
+        times_to_expiry: np.ndarray,  # in years
+        risk_free_rate: float,
+        volatility: float,
+        is_call: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Greeks for many contracts at once; same formulas as _greeks_kernel"""
+        # Deferred so server startup doesn't pay for the scipy import
+        from scipy.special import ndtr
+        
+        strike_prices = np.asarray(strike_prices, dtype=np.float64)
+        times_to_expiry = np.asarray(times_to_expiry, dtype=np.float64)
+        phi = np.where(np.asarray(is_call, dtype=bool), 1.0, -1.0)
+        
+        sqrt_t = np.sqrt(times_to_expiry)
+        sigma_sqrt_t = volatility * sqrt_t
+        discounted_strike = strike_prices * np.exp(-risk_free_rate * times_to_expiry)
+        d1 = (np.log(spot_price / strike_prices) + (risk_free_rate + 0.5 * volatility**2) * times_to_expiry) / sigma_sqrt_t
+        d2 = d1 - sigma_sqrt_t
+        pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+        # One ndtr pass over the whole chain for both d1 and d2; phi flips the
+        # arguments so puts get N(-d1) and N(-d2)
+        N_phi_d1, N_phi_d2 = ndtr(phi * np.stack((d1, d2)))
         
         return {
-            "delta": round(delta, 4),
-            "gamma": round(gamma, 4),
-            "theta": round(theta, 4),
-            "vega": round(vega, 4),
-            "rho": round(rho, 4)
+            "delta": phi * N_phi_d1,
+            "gamma": pdf_d1 / (spot_price * sigma_sqrt_t),
+            "theta": (-spot_price * pdf_d1 * volatility / (2 * sqrt_t) - phi * risk_free_rate * discounted_strike * N_phi_d2) / 365,
+            "vega": spot_price * pdf_d1 * sqrt_t / 100,
+            "rho": phi * times_to_expiry * discounted_strike * N_phi_d2 / 100
         }
 
 class PolygonMCPClient:
@@ -79,25 +148,68 @@ class PolygonMCPClient:
         if not self.api_key:
             raise ValueError("POLYGON_API_KEY environment variable is required")
         
-        self.client = RESTClient(self.api_key)
-        self.http_client = httpx.AsyncClient()
+        # One pooled HTTP/2 client serves every request, so connections
+        # (and their TLS handshakes) are reused across tool calls
+        self.http_client = httpx.AsyncClient(
+            base_url=POLYGON_BASE_URL,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=10.0,
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        self._response_cache: Dict[tuple, tuple] = {}
+    
+    @functools.cached_property
+    def client(self) -> Any:
+        """Polygon SDK client, created on first use so startup skips importing the SDK"""
+        from polygon import RESTClient
+        return RESTClient(self.api_key)
+    
+    async def _cached_fetch(self, key: tuple, ttl: float, fetch, *args) -> Any:
+        """Await fetch(*args), reusing results younger than ttl seconds"""
+        hit = self._response_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < ttl:
+            return hit[1]
+        
+        result = await fetch(*args)
+        # Empty results (e.g. no previous close yet) are retried on the next call
+        if result:
+            self._response_cache.pop(key, None)
+            if len(self._response_cache) >= RESPONSE_CACHE_SIZE:
+                self._response_cache.pop(next(iter(self._response_cache)))
+            self._response_cache[key] = (time.monotonic(), result)
+        return result
+    
+    async def _get_json(self, path: str, **params) -> Any:
+        """GET a Polygon endpoint and return the response's results"""
+        response = await self.http_client.get(path, params=params or None)
+        response.raise_for_status()
+        return response.json().get("results")
+    
+    async def _get_prev_close(self, symbol: str) -> Any:
+        """Previous-day aggregate for a symbol, cached for the session"""
+        return await self._cached_fetch(
+            ("prev_close", symbol.upper()), PREV_CLOSE_CACHE_TTL,
+            self._get_json, f"/v2/aggs/ticker/{symbol.upper()}/prev"
+        )
     
     async def get_stock_price(self, symbol: str) -> Dict[str, Any]:
         """Get current stock price and basic information"""
         try:
-            # Get previous close data
-            prev_close = self.client.get_previous_close_agg(symbol)
-            
-            # Get last trade
-            last_trade = self.client.get_last_trade(symbol)
+            # Get previous close data and last trade together
+            prev_close, last_trade = await asyncio.gather(
+                self._get_prev_close(symbol),
+                self._get_json(f"/v2/last/trade/{symbol.upper()}")
+            )
+            close = prev_close[0]["c"]
             
             return {
                 "symbol": symbol.upper(),
-                "current_price": last_trade.price if last_trade else prev_close[0].close,
-                "previous_close": prev_close[0].close,
-                "volume": prev_close[0].volume,
-                "change": round((last_trade.price - prev_close[0].close) if last_trade else 0, 2),
-                "change_percent": round(((last_trade.price - prev_close[0].close) / prev_close[0].close * 100) if last_trade else 0, 2),
+                "current_price": last_trade["p"] if last_trade else close,
+                "previous_close": close,
+                "volume": prev_close[0]["v"],
+                "change": round((last_trade["p"] - close) if last_trade else 0, 2),
+                "change_percent": round(((last_trade["p"] - close) / close * 100) if last_trade else 0, 2),
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
@@ -107,44 +219,85 @@ class PolygonMCPClient:
         """Get comprehensive options chain data"""
         try:
             # Get options contracts
-            contracts = list(self.client.list_options_contracts(
-                underlying_ticker=symbol,
-                expiration_date=expiration_date,
-                limit=100
-            ))
+            # The SDK paginates synchronously, so the listing runs in a worker
+            # thread and stops after CONTRACTS_LIMIT contracts
+            contracts = await asyncio.to_thread(lambda: list(itertools.islice(
+                self.client.list_options_contracts(
+                    underlying_ticker=symbol,
+                    expiration_date=expiration_date,
+                    limit=CONTRACTS_LIMIT
+                ),
+                CONTRACTS_LIMIT
+            )))
             
             if not contracts:
                 return {"error": f"No options contracts found for {symbol}"}
             
-            # Get current stock price for context
-            stock_data = await self.get_stock_price(symbol)
+            # Get option snapshots concurrently; the semaphore keeps the number
+            # of requests in flight within Polygon's rate limits
+            semaphore = asyncio.Semaphore(_SNAPSHOT_CONCURRENCY)
             
-            options_data = []
-            for contract in contracts:
-                try:
-                    # Get option snapshot
-                    snapshot = self.client.get_snapshot_option(contract.ticker)
-                    
-                    option_info = {
-                        "contract_ticker": contract.ticker,
-                        "strike_price": contract.strike_price,
-                        "expiration_date": contract.expiration_date,
-                        "option_type": contract.contract_type,
-                        "last_price": snapshot.last_quote.bid if snapshot.last_quote else None,
-                        "bid": snapshot.last_quote.bid if snapshot.last_quote else None,
-                        "ask": snapshot.last_quote.ask if snapshot.last_quote else None,
-                        "volume": snapshot.day.volume if snapshot.day else 0,
-                        "open_interest": snapshot.open_interest if hasattr(snapshot, 'open_interest') else None
-                    }
-                    options_data.append(option_info)
-                except Exception as e:
+            async def fetch_snapshot(contract):
+                async with semaphore:
+                    return await self._get_json(f"/v3/snapshot/options/{symbol.upper()}/{contract.ticker}")
+            
+            # Get current stock price for context alongside them
+            stock_data, snapshots = await asyncio.gather(
+                self.get_stock_price(symbol),
+                asyncio.gather(*(fetch_snapshot(contract) for contract in contracts), return_exceptions=True)
+            )
+            
+            # Collect the chain column-wise (one list per field); failed
+            # requests come back from gather as exceptions and are skipped
+            tickers, strikes, expirations, option_types = [], [], [], []
+            bids, asks, volumes, open_interests = [], [], [], []
+            for contract, snapshot in zip(contracts, snapshots):
+                # Failed requests and empty ("results": null) snapshots are skipped
+                if not isinstance(snapshot, dict):
                     continue
+                
+                last_quote = snapshot.get("last_quote") or {}
+                day = snapshot.get("day") or {}
+                tickers.append(contract.ticker)
+                strikes.append(contract.strike_price)
+                expirations.append(contract.expiration_date)
+                option_types.append(contract.contract_type)
+                bids.append(last_quote.get("bid"))
+                asks.append(last_quote.get("ask"))
+                volumes.append(day.get("volume", 0))
+                open_interests.append(snapshot.get("open_interest"))
+            
+            # Prices become float arrays (a missing quote is NaN)
+            bid_array = np.array(bids, dtype=np.float64)
+            ask_array = np.array(asks, dtype=np.float64)
+            
+            # Rows are assembled only here, for the first 50 contracts (for
+            # readability); NaN prices go back to None
+            shown = slice(0, 50)
+            shown_bids = [None if math.isnan(bid) else bid for bid in bid_array[shown].tolist()]
+            shown_asks = [None if math.isnan(ask) else ask for ask in ask_array[shown].tolist()]
+            options_data = [
+                {
+                    "contract_ticker": ticker,
+                    "strike_price": strike,
+                    "expiration_date": expiration,
+                    "option_type": option_type,
+                    "last_price": bid,
+                    "bid": bid,
+                    "ask": ask,
+                    "volume": volume,
+                    "open_interest": open_interest
+                } for ticker, strike, expiration, option_type, bid, ask, volume, open_interest in zip(
+                    tickers[shown], strikes[shown], expirations[shown], option_types[shown],
+                    shown_bids, shown_asks, volumes[shown], open_interests[shown]
+                )
+            ]
             
             return {
                 "symbol": symbol.upper(),
                 "stock_price": stock_data.get("current_price"),
-                "options_count": len(options_data),
-                "options": options_data[:50],  # Limit to first 50 for readability
+                "options_count": len(tickers),
+                "options": options_data,
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
@@ -160,6 +313,14 @@ class PolygonMCPClient:
     ) -> Dict[str, Any]:
         """Calculate Options Greeks using Black-Scholes model"""
         try:
+            # Calculate time to expiry first; expired options need no quote
+            now = datetime.now()
+            exp_date = datetime.fromisoformat(expiration_date)
+            time_to_expiry = (exp_date - now).days / 365.0
+            
+            if time_to_expiry <= 0:
+                return {"error": "Option has already expired"}
+            
             # Get current stock price
             stock_data = await self.get_stock_price(symbol)
             if "error" in stock_data:
@@ -167,13 +328,6 @@ class PolygonMCPClient:
             
             spot_price = stock_data["current_price"]
             
-            # Calculate time to expiry
-            exp_date = datetime.strptime(expiration_date, "%Y-%m-%d")
-            time_to_expiry = (exp_date - datetime.now()).days / 365.0
-            
-            if time_to_expiry <= 0:
-                return {"error": "Option has already expired"}
-            
             # Use provided volatility or default
             vol = volatility or 0.25
             
@@ -195,15 +349,89 @@ class PolygonMCPClient:
                 "option_type": option_type,
                 "volatility": vol,
                 "greeks": greeks,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now.isoformat()
             }
         except Exception as e:
             return {"error": f"Failed to calculate Greeks: {str(e)}"}
     
+    async def calculate_chain_greeks(
+        self,
+        symbol: str,
+        expiration_date: Optional[str] = None,
+        volatility: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Calculate Greeks for every contract in an options chain at once"""
+        try:
+            # The SDK paginates synchronously, so the listing runs in a worker
+            # thread and stops after CONTRACTS_LIMIT contracts
+            contracts = await asyncio.to_thread(lambda: list(itertools.islice(
+                self.client.list_options_contracts(
+                    underlying_ticker=symbol,
+                    expiration_date=expiration_date,
+                    limit=CONTRACTS_LIMIT
+                ),
+                CONTRACTS_LIMIT
+            )))
+            
+            if not contracts:
+                return {"error": f"No options contracts found for {symbol}"}
+            
+            stock_data = await self.get_stock_price(symbol)
+            if "error" in stock_data:
+                return stock_data
+            
+            spot_price = stock_data["current_price"]
+            vol = volatility or 0.25
+            
+            # Expired contracts have no Greeks, so only live ones are priced
+            now = datetime.now()
+            times_to_expiry = np.array([
+                (datetime.fromisoformat(contract.expiration_date) - now).days / 365.0
+                for contract in contracts
+            ])
+            live = np.flatnonzero(times_to_expiry > 0)
+            live_contracts = [contracts[i] for i in live]
+            strikes = np.array([contract.strike_price for contract in live_contracts], dtype=np.float64)
+            
+            greeks = OptionsGreeks.calculate_greeks_vec(
+                spot_price,
+                strikes,
+                times_to_expiry[live],
+                0.05,
+                vol,
+                np.array([contract.contract_type == "call" for contract in live_contracts], dtype=bool)
+            )
+            
+            # One row per contract, like get_options_chain
+            greek_lists = {name: values.tolist() for name, values in greeks.items()}
+            contract_rows = [
+                {
+                    "contract_ticker": contract.ticker,
+                    "strike_price": contract.strike_price,
+                    "expiration_date": contract.expiration_date,
+                    "option_type": contract.contract_type,
+                    **{name: values[index] for name, values in greek_lists.items()}
+                } for index, contract in enumerate(live_contracts)
+            ]
+            
+            return {
+                "symbol": symbol.upper(),
+                "spot_price": spot_price,
+                "expiration_date": expiration_date,
+                "volatility": vol,
+                "contracts_count": len(live_contracts),
+                "contracts": contract_rows,
+                "timestamp": now.isoformat()
+            }
+        except Exception as e:
+            return {"error": f"Failed to calculate chain Greeks: {str(e)}"}
+    
     async def get_market_status(self) -> Dict[str, Any]:
         """Get current market status"""
         try:
-            status = self.client.get_market_status()
+            status = await self._cached_fetch(
+                ("market_status",), MARKET_STATUS_CACHE_TTL, asyncio.to_thread, self.client.get_market_status
+            )
             return {
                 "market": status.market,
                 "server_time": status.server_time,
@@ -222,6 +450,10 @@ class PolygonMCPClient:
 server = Server("polygon-mcp-server")
 polygon_client = PolygonMCPClient()
 
+def _to_json(result: Dict[str, Any]) -> str:
+    """Serialize a tool result as JSON (NumPy scalars and arrays included)"""
+    return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC).decode()
+
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
     """List available tools"""
@@ -289,6 +521,28 @@ async def handle_list_tools() -> list[Tool]:
                 "required": ["symbol", "strike_price", "expiration_date"]
             }
         ),
+        Tool(
+            name="calculate_chain_greeks",
+            description="Calculate Options Greeks for every contract in an options chain using Black-Scholes model",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "Stock symbol (e.g., AAPL, TSLA)"
+                    },
+                    "expiration_date": {
+                        "type": "string",
+                        "description": "Optional expiration date in YYYY-MM-DD format"
+                    },
+                    "volatility": {
+                        "type": "number",
+                        "description": "Optional implied volatility (default: 0.25)"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        ),
         Tool(
             name="get_market_status",
             description="Get current market status and trading hours",
@@ -300,31 +554,39 @@ async def handle_list_tools() -> list[Tool]:
         )
     ]
 
+# Tool name -> coroutine taking the call's arguments, built once at import
+_TOOL_DISPATCH = {
+    "get_stock_price": lambda arguments: polygon_client.get_stock_price(arguments["symbol"]),
+    "get_options_chain": lambda arguments: polygon_client.get_options_chain(
+        arguments["symbol"],
+        arguments.get("expiration_date")
+    ),
+    "calculate_option_greeks": lambda arguments: polygon_client.calculate_option_greeks(
+        arguments["symbol"],
+        arguments["strike_price"],
+        arguments["expiration_date"],
+        arguments.get("option_type", "call"),
+        arguments.get("volatility")
+    ),
+    "calculate_chain_greeks": lambda arguments: polygon_client.calculate_chain_greeks(
+        arguments["symbol"],
+        arguments.get("expiration_date"),
+        arguments.get("volatility")
+    ),
+    "get_market_status": lambda arguments: polygon_client.get_market_status()
+}
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls"""
     try:
-        if name == "get_stock_price":
-            result = await polygon_client.get_stock_price(arguments["symbol"])
-        elif name == "get_options_chain":
-            result = await polygon_client.get_options_chain(
-                arguments["symbol"], 
-                arguments.get("expiration_date")
-            )
-        elif name == "calculate_option_greeks":
-            result = await polygon_client.calculate_option_greeks(
-                arguments["symbol"],
-                arguments["strike_price"],
-                arguments["expiration_date"],
-                arguments.get("option_type", "call"),
-                arguments.get("volatility")
-            )
-        elif name == "get_market_status":
-            result = await polygon_client.get_market_status()
+        handler = _TOOL_DISPATCH.get(name)
+        if handler:
+            result = await handler(arguments)
         else:
             result = {"error": f"Unknown tool: {name}"}
         
-        return [TextContent(type="text", text=str(result))]
+        return [TextContent(type="text", text=_to_json(result))]
     except Exception as e:
         return [TextContent(type="text", text=f"Error: {str(e)}")]
 
@@ -367,7 +629,7 @@ async def handle_read_resource(uri: str) -> str:
         else:
             result = {"error": f"Unknown resource: {uri}"}
         
-        return str(result)
+        return _to_json(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -0,0 +1,4 @@
+import os
+
+# The servers read the key at import; tests never reach the real API
+os.environ.setdefault("POLYGON_API_KEY", "test-key")
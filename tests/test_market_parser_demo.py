@@ -0,0 +1,63 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+import market_parser_demo as demo
+
+
+def _analyze(spot_price, days_to_expiry):
+    client = demo.PolygonMCPClient("test-key")
+    expiration = (date.today() + timedelta(days=days_to_expiry)).isoformat()
+
+    async def stock_price(symbol):
+        return {"symbol": symbol, "price": spot_price}
+
+    async def option_chain(symbol, expiration_date=None):
+        return {"symbol": symbol, "options": [{"contract_type": "call", "expiration_date": expiration}]}
+
+    client.get_stock_price = stock_price
+    client.get_option_chain = option_chain
+    return asyncio.run(client.analyze_option_strategy("AAPL", "covered_call"))
+
+
+@pytest.mark.parametrize("days_to_expiry", [7, 30, 90])
+def test_covered_call_strike_respects_delta_cap(days_to_expiry):
+    analysis = _analyze(100.0, days_to_expiry)
+
+    assert analysis["suggested_strike"] > 100.0
+    assert analysis["suggested_delta"] <= demo.COVERED_CALL_MAX_DELTA
+    # It is the richest strike under the cap: the next strike down is above it
+    deltas = analysis["strike_scan"]["deltas"]
+    index = analysis["strike_scan"]["strikes"].index(analysis["suggested_strike"])
+    assert index > 0 and deltas[index - 1] > demo.COVERED_CALL_MAX_DELTA
+    assert f"${analysis['suggested_strike']:.2f} call" in analysis["recommendation"]
+    assert f"{demo.COVERED_CALL_MAX_DELTA:.2f}" in analysis["recommendation"]
+
+
+def test_covered_call_falls_back_to_nearest_delta():
+    # A year out, even the 15% OTM strike has delta above the cap
+    analysis = _analyze(100.0, 365)
+
+    deltas = analysis["strike_scan"]["deltas"]
+    assert min(deltas) > demo.COVERED_CALL_MAX_DELTA
+    assert analysis["suggested_delta"] == min(deltas)
+    assert "closest" in analysis["recommendation"]
+
+
+def test_closing_a_client_keeps_the_shared_pool_open():
+    async def open_and_close():
+        first = demo.PolygonMCPClient("test-key")
+        second = demo.PolygonMCPClient("test-key")
+        shared = await demo._get_shared_client()
+        await first.close()
+        still_shared = await demo._get_shared_client()
+        open_after_close = not shared.is_closed
+        await second.close()
+        await demo.close_shared_client()
+        return shared, still_shared, open_after_close
+
+    shared, still_shared, open_after_close = asyncio.run(open_and_close())
+
+    assert open_after_close and still_shared is shared
+    assert shared.is_closed and demo._shared_client is None
@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+import polygon_mcp_server as server
+
+
+def _client(handler):
+    client = server.PolygonMCPClient("test-key")
+    client.http_client = httpx.AsyncClient(base_url="https://polygon.test", transport=httpx.MockTransport(handler))
+    client.client = SimpleNamespace(get_last_trade=lambda symbol: SimpleNamespace(price=101.0))
+    return client
+
+
+def test_empty_prev_close_is_not_cached():
+    answers = iter([[], [{"c": 100.0, "v": 1000}]])
+
+    def handler(request):
+        return httpx.Response(200, json={"results": next(answers)})
+
+    client = _client(handler)
+
+    async def fetch_twice():
+        return await client.get_stock_price("test"), await client.get_stock_price("test")
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first["price"] is None
+    assert second["price"] == 100.0
@@ -0,0 +1,268 @@
+import asyncio
+import math
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import orjson
+import pytest
+from scipy.stats import norm
+
+import polygon_mcp_server_clean as clean
+
+
+def _reference_price(spot, strike, tau, rate, vol, is_call):
+    d1 = (math.log(spot / strike) + (rate + 0.5 * vol * vol) * tau) / (vol * math.sqrt(tau))
+    d2 = d1 - vol * math.sqrt(tau)
+    discounted_strike = strike * math.exp(-rate * tau)
+    if is_call:
+        return spot * norm.cdf(d1) - discounted_strike * norm.cdf(d2)
+    return discounted_strike * norm.cdf(-d2) - spot * norm.cdf(-d1)
+
+
+def _client(handler, contracts=()):
+    client = clean.PolygonMCPClient()
+    client.http_client = httpx.AsyncClient(base_url="https://polygon.test", transport=httpx.MockTransport(handler))
+    client.client = SimpleNamespace(list_options_contracts=lambda **params: iter(contracts))
+    return client
+
+
+def _expiration(days_to_expiry):
+    return (date.today() + timedelta(days=days_to_expiry)).isoformat()
+
+
+def _contract(ticker, strike_price, days_to_expiry, contract_type):
+    return SimpleNamespace(
+        ticker=ticker, strike_price=strike_price, expiration_date=_expiration(days_to_expiry), contract_type=contract_type
+    )
+
+
+def _stock_routes(request):
+    if request.url.path.endswith("/prev"):
+        return httpx.Response(200, json={"results": [{"c": 100.0, "v": 1000}]})
+    if "/last/trade/" in request.url.path:
+        return httpx.Response(200, json={"results": {"p": 100.0}})
+    return None
+
+
+def _snapshot_routes(request):
+    return _stock_routes(request) or httpx.Response(
+        200, json={"results": {"last_quote": {"bid": 4.0, "ask": 4.2}, "implied_volatility": 0.3}}
+    )
+
+
+@pytest.mark.parametrize("numba_kernel", [True, False])
+def test_batch_greeks_match_scalar(monkeypatch, numba_kernel):
+    monkeypatch.setattr(clean, "NUMBA_AVAILABLE", numba_kernel and clean.NUMBA_AVAILABLE)
+    strikes = np.array([80.0, 100.0, 125.0, 80.0, 100.0, 125.0])
+    taus = np.array([0.1, 0.5, 1.0, 0.1, 0.5, 1.0])
+    sigmas = np.array([0.2, 0.37, 0.5, 0.2, 0.37, 0.5])
+    is_call = np.array([True, True, True, False, False, False])
+
+    batch = clean.OptionsGreeks.calculate_greeks_batch(100.0, strikes, taus, 0.05, sigmas, is_call)
+
+    for index in range(len(strikes)):
+        option_type = "call" if is_call[index] else "put"
+        scalar = clean.OptionsGreeks.calculate_greeks(100.0, strikes[index], taus[index], 0.05, sigmas[index], option_type)
+        for name, value in scalar.items():
+            # The batch Greeks are float32
+            assert batch[name][index] == pytest.approx(value, rel=1e-5, abs=1e-7)
+    assert np.all((batch["rho"] < 0) == ~is_call)
+
+
+def test_options_chain_gives_expired_contracts_intrinsic_greeks():
+    contracts = [
+        _contract("O:ITMCALL", 90.0, -3, "call"),
+        _contract("O:OTMCALL", 110.0, -3, "call"),
+        _contract("O:ITMPUT", 110.0, 0, "put"),
+        _contract("O:OTMPUT", 90.0, -3, "put"),
+        _contract("O:LIVE", 100.0, 30, "put"),
+    ]
+
+    result = orjson.loads(clean._to_json(asyncio.run(_client(_snapshot_routes, contracts).get_options_chain("test"))))
+
+    rows = {row["contract_ticker"]: row for row in result["options"]}
+    for contract in contracts[:4]:
+        expected = clean.OptionsGreeks.calculate_greeks(100.0, contract.strike_price, 0.0, 0.05, 0.3, contract.contract_type)
+        assert {name: rows[contract.ticker][name] for name in expected} == expected
+    assert [rows[ticker]["delta"] for ticker in ("O:ITMCALL", "O:OTMCALL", "O:ITMPUT", "O:OTMPUT")] == [1.0, 0.0, -1.0, 0.0]
+    assert rows["O:LIVE"]["gamma"] > 0
+
+
+def test_options_chain_skips_failed_and_empty_snapshots():
+    contracts = [_contract(f"O:TEST{index}", 100.0, 30, "call") for index in range(3)]
+
+    def handler(request):
+        ticker = request.url.path.rsplit("/", 1)[-1]
+        if ticker == "O:TEST1":
+            return httpx.Response(404, json={})
+        if ticker == "O:TEST2":
+            return httpx.Response(200, json={"results": None})
+        return _snapshot_routes(request)
+
+    result = asyncio.run(_client(handler, contracts).get_options_chain("test"))
+
+    assert result["options_count"] == 1
+    assert [row["contract_ticker"] for row in orjson.loads(clean._to_json(result))["options"]] == ["O:TEST0"]
+
+
+def test_options_chain_lists_at_most_100_contracts():
+    contracts = [_contract(f"O:TEST{index}", 100.0, 30, "call") for index in range(250)]
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        return _snapshot_routes(request)
+
+    result = asyncio.run(_client(handler, contracts).get_options_chain("test"))
+
+    assert result["options_count"] == 100
+    assert sum(path.startswith("/v3/snapshot/") for path in requested) == 100
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+@pytest.mark.parametrize("strike", [80.0, 100.0, 125.0])
+def test_bs_price_matches_scipy_reference(is_call, strike):
+    assert clean._bs_price(100.0, strike, 0.5, 0.05, 0.37, is_call) == pytest.approx(
+        _reference_price(100.0, strike, 0.5, 0.05, 0.37, is_call), rel=1e-9
+    )
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+@pytest.mark.parametrize("strike", [80.0, 100.0, 125.0])
+def test_implied_vol_round_trip(is_call, strike):
+    price = _reference_price(100.0, strike, 0.5, 0.05, 0.37, is_call)
+
+    assert clean._implied_vol(price, 100.0, strike, 0.5, 0.05, is_call) == pytest.approx(0.37, abs=1e-6)
+    assert clean._implied_vol_nb(price, 100.0, strike, 0.5, 0.05, is_call) == pytest.approx(0.37, abs=1e-6)
+
+
+def test_implied_vol_out_of_range():
+    # Below intrinsic value no volatility reproduces the price
+    assert clean._implied_vol(15.0, 100.0, 80.0, 0.5, 0.05, True) is None
+    assert math.isnan(clean._implied_vol_nb(15.0, 100.0, 80.0, 0.5, 0.05, True))
+
+
+def test_option_greeks_use_quoted_implied_vol():
+    expiration = _expiration(180)
+    tau = (datetime.fromisoformat(expiration) - datetime.now()).days / 365.0
+    mid = _reference_price(100.0, 100.0, tau, 0.05, 0.37, True)
+
+    def handler(request):
+        return _stock_routes(request) or httpx.Response(
+            200, json={"results": {"last_quote": {"bid": mid - 0.05, "ask": mid + 0.05}}}
+        )
+
+    result = asyncio.run(_client(handler).calculate_option_greeks("test", 100.0, expiration, "call"))
+
+    assert result["volatility_source"] == "implied"
+    assert result["volatility"] == pytest.approx(0.37, abs=1e-6)
+
+
+def test_option_greeks_fall_back_without_a_quote():
+    def handler(request):
+        return _stock_routes(request) or httpx.Response(200, json={"results": None})
+
+    result = asyncio.run(_client(handler).calculate_option_greeks("test", 100.0, _expiration(180), "call"))
+
+    assert result["volatility_source"] == "default"
+    assert result["volatility"] == 0.25
+
+
+@pytest.mark.parametrize("option_type", ["call", "put"])
+def test_greeks_match_scipy_reference(option_type):
+    phi = 1.0 if option_type == "call" else -1.0
+    d1 = (math.log(100.0 / 110.0) + (0.05 + 0.5 * 0.37 ** 2) * 0.5) / (0.37 * math.sqrt(0.5))
+    d2 = d1 - 0.37 * math.sqrt(0.5)
+    discounted_strike = 110.0 * math.exp(-0.05 * 0.5)
+
+    greeks = clean.OptionsGreeks.calculate_greeks(100.0, 110.0, 0.5, 0.05, 0.37, option_type)
+
+    expected = {
+        "delta": phi * norm.cdf(phi * d1),
+        "gamma": norm.pdf(d1) / (100.0 * 0.37 * math.sqrt(0.5)),
+        "theta": (-100.0 * norm.pdf(d1) * 0.37 / (2 * math.sqrt(0.5))
+                  - phi * 0.05 * discounted_strike * norm.cdf(phi * d2)) / 365,
+        "vega": 100.0 * norm.pdf(d1) * math.sqrt(0.5) / 100,
+        "rho": phi * 0.5 * discounted_strike * norm.cdf(phi * d2) / 100,
+    }
+    for name, value in expected.items():
+        assert greeks[name] == pytest.approx(value, rel=1e-9)
+    assert (greeks["rho"] < 0) == (option_type == "put")
+
+
+def test_implied_vol_batch_round_trip():
+    strikes = np.array([80.0, 100.0, 125.0, 100.0])
+    taus = np.array([0.25, 0.5, 1.0, 2.0])
+    is_call = np.array([True, False, True, False])
+    prices = np.array([
+        _reference_price(100.0, strike, tau, 0.05, 0.37, call)
+        for strike, tau, call in zip(strikes, taus, is_call)
+    ])
+
+    vols = clean._implied_vol_batch_nb(prices, 100.0, strikes, taus, 0.05, is_call)
+
+    np.testing.assert_allclose(vols, 0.37, atol=1e-6)
+
+
+def test_chain_with_greeks_rows():
+    expiration = _expiration(180)
+    tau = (datetime.fromisoformat(expiration) - datetime.now()).days / 365.0
+    mid = _reference_price(100.0, 100.0, tau, 0.05, 0.37, False)
+    snapshots = [
+        {"details": {"ticker": "O:PUT", "strike_price": 100.0, "expiration_date": expiration, "contract_type": "put"},
+         "last_quote": {"bid": mid - 0.05, "ask": mid + 0.05}},
+        {"details": {"ticker": "O:CALL", "strike_price": 120.0, "expiration_date": expiration, "contract_type": "call"},
+         "last_quote": {}},
+    ]
+
+    def handler(request):
+        return _stock_routes(request) or httpx.Response(200, json={"results": snapshots})
+
+    result = orjson.loads(clean._to_json(asyncio.run(_client(handler).get_chain_with_greeks("test"))))
+
+    put, call = result["options"]
+    assert put["contract_ticker"] == "O:PUT"
+    assert put["implied_volatility"] == pytest.approx(0.37, abs=1e-6)
+    expected = clean.OptionsGreeks.calculate_greeks(100.0, 100.0, tau, 0.05, put["implied_volatility"], "put")
+    for name, value in expected.items():
+        assert put[name] == pytest.approx(value, rel=1e-5)
+    assert put["delta"] < 0 and put["rho"] < 0
+    # No two-sided quote: no IV to solve, so no Greeks either
+    assert call["mid_price"] is None
+    assert call["implied_volatility"] is None and call["delta"] is None
+
+
+@pytest.mark.parametrize("results", [None, []])
+def test_chain_with_greeks_without_snapshots(results):
+    def handler(request):
+        return _stock_routes(request) or httpx.Response(200, json={"results": results})
+
+    result = asyncio.run(_client(handler).get_chain_with_greeks("test"))
+
+    assert result == {"error": "No options contracts found for test"}
+
+
+def test_chain_with_greeks_failed_snapshot():
+    def handler(request):
+        return _stock_routes(request) or httpx.Response(500, json={})
+
+    result = asyncio.run(_client(handler).get_chain_with_greeks("test"))
+
+    assert result["error"].startswith("Failed to get options chain with Greeks")
+
+
+def test_lifespan_closes_the_client_after_the_last_session():
+    async def run_sessions():
+        async with clean.lifespan(clean.mcp) as first:
+            async with clean.lifespan(clean.mcp) as second:
+                assert second["polygon_client"] is first["polygon_client"]
+            client = first["polygon_client"]
+            assert not client.http_client.is_closed
+        return client
+
+    client = asyncio.run(run_sessions())
+
+    assert client.http_client.is_closed
+    assert clean.polygon_client is None
@@ -0,0 +1,197 @@
+import asyncio
+import math
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+import polygon_mcp_server_stdio as stdio
+
+
+def _client(handler, contracts=()):
+    client = stdio.PolygonMCPClient()
+    client.http_client = httpx.AsyncClient(base_url="https://polygon.test", transport=httpx.MockTransport(handler))
+    client.client = SimpleNamespace(list_options_contracts=lambda **params: iter(contracts))
+    return client
+
+
+def _contract(index, days_to_expiry, contract_type="call"):
+    return SimpleNamespace(
+        ticker=f"O:TEST{index}",
+        strike_price=90.0 + 5 * index,
+        expiration_date=(date.today() + timedelta(days=days_to_expiry)).isoformat(),
+        contract_type=contract_type,
+    )
+
+
+def _stock_routes(request):
+    if request.url.path.endswith("/prev"):
+        return httpx.Response(200, json={"results": [{"c": 100.0, "v": 1000}]})
+    if "/last/trade/" in request.url.path:
+        return httpx.Response(200, json={"results": {"p": 101.0}})
+    return None
+
+
+def test_options_chain_skips_failed_and_empty_snapshots():
+    contracts = [_contract(index, 30) for index in range(4)]
+
+    def handler(request):
+        stock = _stock_routes(request)
+        if stock is not None:
+            return stock
+        ticker = request.url.path.rsplit("/", 1)[-1]
+        if ticker == "O:TEST1":
+            return httpx.Response(404, json={})
+        if ticker == "O:TEST2":
+            return httpx.Response(200, json={"results": None})
+        quote = {} if ticker == "O:TEST3" else {"bid": 1.5, "ask": 1.7}
+        return httpx.Response(200, json={"results": {"last_quote": quote, "day": {"volume": 7}, "open_interest": 3}})
+
+    result = asyncio.run(_client(handler, contracts).get_options_chain("test"))
+
+    assert result["options_count"] == 2
+    assert [row["contract_ticker"] for row in result["options"]] == ["O:TEST0", "O:TEST3"]
+    assert result["options"][0]["bid"] == 1.5
+    assert result["options"][1]["bid"] is None
+    assert '"bid":null' in stdio._to_json(result)
+
+
+def test_options_chain_lists_at_most_contracts_limit():
+    contracts = [_contract(index, 30) for index in range(250)]
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        return _stock_routes(request) or httpx.Response(200, json={"results": {"last_quote": {"bid": 1.0, "ask": 1.1}}})
+
+    result = asyncio.run(_client(handler, contracts).get_options_chain("test"))
+
+    assert result["options_count"] == stdio.CONTRACTS_LIMIT
+    assert sum(path.startswith("/v3/snapshot/") for path in requested) == stdio.CONTRACTS_LIMIT
+
+
+def test_chain_greeks_lists_at_most_contracts_limit():
+    contracts = [_contract(index, 30) for index in range(250)]
+
+    result = asyncio.run(_client(_stock_routes, contracts).calculate_chain_greeks("test"))
+
+    assert result["contracts_count"] == stdio.CONTRACTS_LIMIT
+
+
+def test_vectorized_greeks_match_scalar():
+    strikes = np.array([80.0, 100.0, 125.0, 80.0, 100.0, 125.0])
+    taus = np.array([0.1, 0.5, 1.0, 0.1, 0.5, 1.0])
+    is_call = np.array([True, True, True, False, False, False])
+
+    vec = stdio.OptionsGreeks.calculate_greeks_vec(100.0, strikes, taus, 0.05, 0.37, is_call)
+
+    for index in range(len(strikes)):
+        option_type = "call" if is_call[index] else "put"
+        scalar = stdio.OptionsGreeks.calculate_greeks(100.0, strikes[index], taus[index], 0.05, 0.37, option_type)
+        for name, value in scalar.items():
+            assert vec[name][index] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+def test_chain_greeks_price_only_live_contracts():
+    contracts = [_contract(0, -5), _contract(1, 60, "call"), _contract(2, 200, "put")]
+
+    result = asyncio.run(_client(_stock_routes, contracts).calculate_chain_greeks("test", volatility=0.37))
+
+    assert result["contracts_count"] == 2
+    assert [row["contract_ticker"] for row in result["contracts"]] == ["O:TEST1", "O:TEST2"]
+    now = datetime.now()
+    for row, contract in zip(result["contracts"], contracts[1:]):
+        assert row["strike_price"] == contract.strike_price
+        assert row["option_type"] == contract.contract_type
+        tau = (datetime.fromisoformat(contract.expiration_date) - now).days / 365.0
+        expected = stdio.OptionsGreeks.calculate_greeks(101.0, contract.strike_price, tau, 0.05, 0.37, contract.contract_type)
+        for name, value in expected.items():
+            assert row[name] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+def test_chain_greeks_without_contracts():
+    result = asyncio.run(_client(_stock_routes).calculate_chain_greeks("test"))
+
+    assert result == {"error": "No options contracts found for test"}
+
+
+def test_prev_close_cache_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(stdio.time, "monotonic", lambda: clock[0])
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        return _stock_routes(request)
+
+    client = _client(handler)
+
+    async def fetch_three():
+        await client.get_stock_price("test")
+        clock[0] += stdio.PREV_CLOSE_CACHE_TTL - 1
+        await client.get_stock_price("test")
+        clock[0] += 2
+        return await client.get_stock_price("test")
+
+    result = asyncio.run(fetch_three())
+
+    assert result["previous_close"] == 100.0
+    assert requested.count("/v2/aggs/ticker/TEST/prev") == 2
+
+
+def test_empty_prev_close_is_not_cached():
+    answers = iter([None, [{"c": 100.0, "v": 1000}]])
+
+    def handler(request):
+        if request.url.path.endswith("/prev"):
+            return httpx.Response(200, json={"results": next(answers)})
+        return _stock_routes(request)
+
+    client = _client(handler)
+
+    async def fetch_twice():
+        return await client.get_stock_price("test"), await client.get_stock_price("test")
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert "error" in first
+    assert second["previous_close"] == 100.0
+
+
+def test_response_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(stdio, "RESPONSE_CACHE_SIZE", 2)
+    client = _client(_stock_routes)
+
+    async def fetch_all():
+        for symbol in ("a", "b", "c"):
+            await client.get_stock_price(symbol)
+
+    asyncio.run(fetch_all())
+
+    assert list(client._response_cache) == [("prev_close", "B"), ("prev_close", "C")]
+
+
+@pytest.mark.parametrize("option_type", ["call", "put"])
+@pytest.mark.parametrize("strike", [80.0, 100.0, 125.0])
+def test_greeks_match_scipy_reference(option_type, strike):
+    phi = 1.0 if option_type == "call" else -1.0
+    d1 = (math.log(100.0 / strike) + (0.05 + 0.5 * 0.37 ** 2) * 0.5) / (0.37 * math.sqrt(0.5))
+    d2 = d1 - 0.37 * math.sqrt(0.5)
+    discounted_strike = strike * math.exp(-0.05 * 0.5)
+
+    greeks = stdio.OptionsGreeks.calculate_greeks(100.0, strike, 0.5, 0.05, 0.37, option_type)
+
+    expected = {
+        "delta": phi * norm.cdf(phi * d1),
+        "gamma": norm.pdf(d1) / (100.0 * 0.37 * math.sqrt(0.5)),
+        "theta": (-100.0 * norm.pdf(d1) * 0.37 / (2 * math.sqrt(0.5))
+                  - phi * 0.05 * discounted_strike * norm.cdf(phi * d2)) / 365,
+        "vega": 100.0 * norm.pdf(d1) * math.sqrt(0.5) / 100,
+        "rho": phi * 0.5 * discounted_strike * norm.cdf(phi * d2) / 100,
+    }
+    for name, value in expected.items():
+        assert greeks[name] == pytest.approx(value, rel=1e-9, abs=1e-12)
+    assert (greeks["rho"] < 0) == (option_type == "put")